@@ -419,34 +419,18 @@ export default function Schedule() {
       // Если кэш не актуален или его нет, загружаем данные с сервера
       console.log('Fetching new week schedule from API...');
 
-      const results = [];
-
-      // Последовательно выполняем запросы для каждого дня
-      for (const date of dates) {
-        const formattedDate = date.format('YYYY-MM-DD');
-        console.log(`Fetching schedule for ${formattedDate}`);
-
-        try {
-          const response = await api.get('/schedule', {
-            params: { date: formattedDate }
-          });
-
-          results.push({
-            date: formattedDate,
-            data: response.data
-          });
-
-          console.log(`Got data for ${formattedDate}: ${response.data.length} items`);
-        } catch (error) {
-          console.error(`Error fetching schedule for ${formattedDate}:`, error);
-          results.push({ date: formattedDate, data: [] });
-        }
-      }
+      // Загружаем всю неделю одним запросом
+      const weekFrom = dates[0].format('YYYY-MM-DD');
+      const weekTo = dates[dates.length - 1].format('YYYY-MM-DD');
+      const response = await api.get('/schedule', {
+        params: { from: weekFrom, to: weekTo }
+      });
 
       // Формируем объект с расписанием на неделю
       const newWeekSchedule = {};
-      results.forEach(({ date, data }) => {
-        newWeekSchedule[date] = data;
+      dates.forEach((date) => {
+        const formattedDate = date.format('YYYY-MM-DD');
+        newWeekSchedule[formattedDate] = response.data[formattedDate] || [];
       });
 
       console.log('Week schedule loaded:', Object.keys(newWeekSchedule).length, 'days');
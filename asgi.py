@@ -0,0 +1,364 @@
+"""
+ASGI entry point with async schedule/profile reads
+
+    pip install -r requirements-asgi.txt       # starlette, aiomysql, a2wsgi, uvicorn
+    python mig.py                              # one-shot schema setup and migrations
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+GET /api/schedule, /api/schedule/changes, /api/profile and /api/profile/details
+are answered on the event loop from an aiomysql pool, so a request waiting on
+MySQL holds no thread. They return the same JSON, ETags and auth errors as the
+Flask routes in server.py. Every other path is handed to the Flask app unchanged.
+"""
+import asyncio
+import contextlib
+import os
+
+import aiomysql
+import jwt
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from server import (DB_CONFIG, IDENTITY_QUERY, PROFILE_DETAILS_QUERY, PROFILE_QUERY, SCHEDULE_LESSON_QUERY,
+                    SCHEDULE_SYNC_STATE_QUERY, SCHEDULE_VALIDATOR_QUERY, app as flask_app,
+                    compose_schedule_body, compress_body, decode_token, group_lessons_by_date, identity_cache,
+                    make_etag, parse_schedule_range, parse_since, preload, profile_subject, query_key,
+                    schedule_changes_payload, schedule_changes_queries, schedule_days, schedule_filter,
+                    schedule_invalidations, schedule_payload, schedule_period_label, schedule_read_model,
+                    schedule_response_cache, schedule_sync_reset, schedule_window_clause, shape_profile_details,
+                    use_schedule_read_model, user_invalidations)
+
+# Connections per process; one in-flight query each, so this caps concurrent DB reads
+ASYNC_DB_POOL_CONFIG = {
+    'minsize': int(os.environ.get('ASYNC_DB_POOL_MIN_SIZE', 2)),
+    'maxsize': int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE', 50)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 3600))
+}
+
+logger = flask_app.logger
+db_pool = None
+
+
+# ============================================================
+# DATABASE
+# ============================================================
+
+async def open_pool():
+    global db_pool
+    db_pool = await aiomysql.create_pool(
+        host=DB_CONFIG['host'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        db=DB_CONFIG['db'],
+        charset=DB_CONFIG['charset'],
+        use_unicode=DB_CONFIG['use_unicode'],
+        cursorclass=aiomysql.DictCursor,
+        autocommit=True,
+        **ASYNC_DB_POOL_CONFIG
+    )
+
+
+async def close_pool():
+    if db_pool is not None:
+        db_pool.close()
+        await db_pool.wait_closed()
+
+
+async def fetch_one(query, params):
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchone()
+
+
+async def fetch_all(query, params):
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+
+# ============================================================
+# RESPONSE HELPERS
+# ============================================================
+
+def json_response(payload, status=200, headers=None, request=None):
+    """
+    Body encoded by the Flask app's JSON provider, byte-for-byte what jsonify sends
+
+    With the request given, the body is compressed like server.compress_response does.
+    """
+    return encoded_json_response((flask_app.json.dumps(payload) + '\n').encode('utf-8'), status, headers, request)
+
+
+def encoded_json_response(body, status=200, headers=None, request=None):
+    """json_response for a body that is already encoded JSON"""
+    headers = dict(headers or {})
+
+    if request is not None:
+        headers['Vary'] = 'Accept-Encoding'
+        body, encoding = compress_body(body, parse_accept_header(request.headers.get('accept-encoding')))
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+            if 'ETag' in headers:
+                headers['ETag'] = 'W/' + headers['ETag']
+
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+def etag_response(payload, etag, request):
+    return json_response(payload, headers={'ETag': quote_etag(etag), 'Cache-Control': 'private, no-cache'},
+                         request=request)
+
+
+def encoded_etag_response(body, etag, request):
+    return encoded_json_response(body, headers={'ETag': quote_etag(etag), 'Cache-Control': 'private, no-cache'},
+                                 request=request)
+
+
+def is_not_modified(request, etag):
+    return parse_etags(request.headers.get('if-none-match')).contains_weak(etag)
+
+
+def not_modified_response(etag):
+    return Response(status_code=304, headers={'ETag': quote_etag(etag)})
+
+
+def request_query_key(request):
+    return query_key(request.url.path, request.query_params.multi_items())
+
+
+# ============================================================
+# AUTHENTICATION
+# ============================================================
+
+async def poll_invalidations(feed):
+    """Async counterpart of server.InvalidationFeed.refresh"""
+    since = feed.claim()
+    if since is not None:
+        try:
+            feed.apply(await fetch_all(feed.query, (since,)))
+        except Exception as e:
+            logger.warning(f'{feed.name} invalidation poll error: {str(e)}')
+
+
+async def load_identity(user_id):
+    """Async counterpart of server.load_identity sharing its cache"""
+    await poll_invalidations(user_invalidations)
+
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        identity = await fetch_one(IDENTITY_QUERY, (user_id,))
+        if identity:
+            identity_cache.put(user_id, identity)
+    return identity
+
+
+def require_auth(handler):
+    """Same checks and error bodies as server.require_auth; passes (request, user_id, user)"""
+
+    async def decorated(request):
+        auth_header = request.headers.get('authorization')
+
+        if not auth_header:
+            return json_response({'error': 'Authorization header is missing'}, 401)
+
+        try:
+            parts = auth_header.split()
+            if parts[0].lower() != 'bearer' or len(parts) != 2:
+                return json_response({'error': 'Invalid authorization format'}, 401)
+
+            payload = decode_token(parts[1])
+            user_id = payload['user_id']
+
+            user = await load_identity(user_id)
+            if not user:
+                return json_response({'error': 'User not found'}, 401)
+
+            return await handler(request, user_id, user)
+
+        except jwt.ExpiredSignatureError:
+            return json_response({'error': 'Token has expired'}, 401)
+        except jwt.InvalidTokenError:
+            return json_response({'error': 'Invalid token'}, 401)
+        except Exception as e:
+            logger.error(f'Auth error: {str(e)}')
+            return json_response({'error': str(e)}, 500)
+
+    return decorated
+
+
+# ============================================================
+# READ ROUTES
+# ============================================================
+
+@require_auth
+async def get_schedule(request, user_id, user):
+    """Get schedule for a date, a date range, a week or a semester"""
+    try:
+        try:
+            mode, date_from, date_to, semester = parse_schedule_range(request.query_params)
+        except ValueError as e:
+            logger.warning(f'SCHEDULE REQUEST ERROR: User {user_id} - {str(e)}')
+            return json_response({'error': str(e)}, 400)
+
+        filter_column, filter_value = schedule_filter(user)
+        display_period = schedule_period_label(mode, date_from, date_to, semester)
+
+        user_type_ru = "преподаватель" if user['user_type'] == 'teacher' else "студент"
+        logger.info(
+            f'SCHEDULE REQUESTED: {user["full_name"]} ({user_type_ru}) requested schedule for {display_period}')
+
+        # Day lists encoded once and shared by everyone with the same group/teacher
+        if schedule_response_cache.cacheable(filter_value, mode, date_from, date_to):
+            await poll_invalidations(schedule_invalidations)
+            days = schedule_days(date_from, date_to)
+            entries = schedule_response_cache.get_days(filter_column, filter_value, days)
+            if entries is None:
+                generation = schedule_response_cache.generation
+                if flask_app.config['SCHEDULE_READ_MODEL'] and await asyncio.to_thread(use_schedule_read_model):
+                    with schedule_read_model.lock:
+                        store = schedule_read_model.store
+                        lessons = store.materialize(store.window(filter_column, filter_value, date_from, date_to))
+                else:
+                    where_clause, params = schedule_window_clause(filter_column, filter_value, mode, date_from,
+                                                                  date_to, None)
+                    lessons = await fetch_all(SCHEDULE_LESSON_QUERY + where_clause + ' ORDER BY date, time_start',
+                                              params)
+                entries = schedule_response_cache.put_days(filter_column, filter_value, days,
+                                                           group_lessons_by_date(lessons), generation)
+
+            etag = make_etag(request_query_key(request), filter_column, filter_value, *(entry[1] for entry in entries))
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+
+            logger.info(f'SCHEDULE DATA: {user["full_name"]} received {sum(entry[2] for entry in entries)} '
+                        f'classes for {display_period}')
+            return encoded_etag_response(compose_schedule_body(mode, days, entries), etag, request)
+
+        # The read model refreshes with blocking queries now and then; keep that off the loop
+        if flask_app.config['SCHEDULE_READ_MODEL'] and await asyncio.to_thread(use_schedule_read_model):
+            with schedule_read_model.lock:
+                store = schedule_read_model.store
+                if mode == 'semester':
+                    slots = store.window(filter_column, filter_value, semester=semester)
+                else:
+                    slots = store.window(filter_column, filter_value, date_from, date_to)
+
+                etag = make_etag(request_query_key(request), filter_column, filter_value, *store.validator(slots))
+                if is_not_modified(request, etag):
+                    return not_modified_response(etag)
+
+                schedule = store.materialize(slots)
+        else:
+            where_clause, params = schedule_window_clause(filter_column, filter_value, mode, date_from, date_to,
+                                                          semester)
+
+            validator = await fetch_one(SCHEDULE_VALIDATOR_QUERY + where_clause, params)
+            etag = make_etag(request_query_key(request), filter_column, filter_value,
+                             validator['count'], validator['last_updated'])
+            if is_not_modified(request, etag):
+                return not_modified_response(etag)
+
+            schedule = await fetch_all(SCHEDULE_LESSON_QUERY + where_clause + ' ORDER BY date, time_start', params)
+
+        logger.info(f'SCHEDULE DATA: {user["full_name"]} received {len(schedule)} classes for {display_period}')
+
+        return etag_response(schedule_payload(mode, schedule, date_from, date_to), etag, request)
+
+    except Exception as e:
+        logger.error(f'Error getting schedule for user {user_id}: {str(e)}')
+        return json_response({'error': str(e)}, 500)
+
+
+@require_auth
+async def get_schedule_changes(request, user_id, user):
+    """Get lessons changed or deleted since an earlier sync for the user's group or teacher name"""
+    try:
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError as e:
+            logger.warning(f'SCHEDULE CHANGES REQUEST ERROR: User {user_id} - {str(e)}')
+            return json_response({'error': str(e)}, 400)
+
+        filter_column, filter_value = schedule_filter(user)
+        state = await fetch_one(SCHEDULE_SYNC_STATE_QUERY, ())
+
+        changed, deleted = [], []
+        if filter_value and not schedule_sync_reset(state, since):
+            changes_query, tombstones_query = schedule_changes_queries(filter_column)
+            changed = await fetch_all(changes_query, (filter_value, since))
+            deleted = [row['schedule_id'] for row in await fetch_all(tombstones_query, (filter_value, since))]
+
+        return json_response(schedule_changes_payload(state, since, changed, deleted), request=request)
+
+    except Exception as e:
+        logger.error(f'Error getting schedule changes for user {user_id}: {str(e)}')
+        return json_response({'error': str(e)}, 500)
+
+
+@require_auth
+async def get_profile(request, user_id, user):
+    """Get user profile"""
+    try:
+        profile = await fetch_one(PROFILE_QUERY, (user_id,))
+        if not profile:
+            return json_response({'error': 'User not found'}, 404)
+
+        return json_response(profile, request=request)
+
+    except Exception as e:
+        logger.error(f'Profile fetch error: {str(e)}')
+        return json_response({'error': str(e)}, 500)
+
+
+@require_auth
+async def get_profile_details(request, user_id, user):
+    """Get detailed user profile information"""
+    try:
+        kind, name = profile_subject(user)
+        user_details = await fetch_one(PROFILE_DETAILS_QUERY, (kind, name, user_id))
+
+        if not user_details:
+            return json_response({'error': 'User not found'}, 404)
+
+        return json_response(shape_profile_details(kind, user_details), request=request)
+
+    except Exception as e:
+        logger.error(f'Profile details error: {str(e)}')
+        return json_response({'error': str(e)}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Runs in each worker after fork, so every process gets its own connections
+    await open_pool()
+    try:
+        yield
+    finally:
+        await close_pool()
+
+
+# Imported once in the gunicorn master (preload_app), as with wsgi.py
+preload()
+
+app = Starlette(
+    routes=[
+        Route('/api/schedule', get_schedule, methods=['GET']),
+        Route('/api/schedule/changes', get_schedule_changes, methods=['GET']),
+        Route('/api/profile', get_profile, methods=['GET']),
+        Route('/api/profile/details', get_profile_details, methods=['GET']),
+        Mount('/', WSGIMiddleware(flask_app))
+    ],
+    middleware=[
+        # Same policy flask_cors applies to the Flask routes
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=['ETag', 'X-Next-Cursor'])
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,134 @@
+"""
+Encode time and bytes on the wire for representative list payloads
+
+Compares the stdlib encoder with the settings of Flask's default provider
+against orjson (FastJSONProvider in server.py), each raw, gzip-6 and brotli-5.
+"""
+import gzip
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RUNS = 50
+SUBJECTS = ['Математический анализ', 'Физика', 'Программирование', 'История', 'Иностранный язык',
+            'Базы данных', 'Операционные системы', 'Философия']
+LESSON_TYPES = ['лекция', 'практика', 'лабораторная']
+
+
+def http_date(value):
+    """What Flask's default provider sends for date/datetime values"""
+    return value.strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+
+def default(value):
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def schedule_page(rows=500):
+    """admin_get_schedules page: 15 columns, dates/times already formatted by MySQL"""
+    day = date(2025, 2, 3)
+    return {'schedules': [{
+        'id': i,
+        'semester': 2,
+        'week_number': i // 40 + 1,
+        'group_name': f'ИВТ-{random.randint(1, 40)}',
+        'course': random.randint(1, 4),
+        'faculty': 'Факультет информационных технологий',
+        'subject': random.choice(SUBJECTS),
+        'lesson_type': random.choice(LESSON_TYPES),
+        'subgroup': random.randint(0, 2),
+        'date': (day + timedelta(days=i // 20)).isoformat(),
+        'time_start': '09:00',
+        'time_end': '10:30',
+        'weekday': (i // 20) % 6 + 1,
+        'teacher_name': f'Преподаватель {random.randint(1, 200)} И.О.',
+        'auditory': f'{random.randint(1, 5)}-{random.randint(100, 450)}'
+    } for i in range(rows)], 'total': 12000, 'limit': rows}
+
+
+def users_page(rows=500):
+    """admin_get_users page: full rows with DictCursor datetimes"""
+    created = datetime(2024, 9, 1, 8, 0, 0)
+    return {'users': [{
+        'id': i,
+        'email': f'user{i}@university.ru',
+        'full_name': f'Студент Номер {i}',
+        'user_type': 'student',
+        'group_name': f'ИВТ-{random.randint(1, 40)}',
+        'teacher_name': None,
+        'status': 'active',
+        'created_at': created + timedelta(minutes=i),
+        'updated_at': created + timedelta(days=1, minutes=i)
+    } for i in range(rows)], 'total': 8000, 'limit': rows}
+
+
+def name_list(count=1500):
+    """/api/groups and /api/teachers lists"""
+    return sorted(f'Преподаватель {i} И.О.' for i in range(count))
+
+
+def analytics(rows=200):
+    """Aggregate rows with Decimal SUM() values"""
+    return [{'month': f'2025-{i % 12 + 1:02d}', 'count': Decimal(i * 3)} for i in range(rows)]
+
+
+def encode_stdlib(payload):
+    # Flask DefaultJSONProvider settings for non-debug responses
+    return json.dumps(payload, default=default, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode()
+
+
+def encode_orjson(payload):
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    return orjson.dumps(payload, default=default, option=options)
+
+
+def median_ms(function, payload):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        function(payload)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    random.seed(1)
+    payloads = [('schedule page x500', schedule_page()), ('users page x500', users_page()),
+                ('teacher list x1500', name_list()), ('analytics x200', analytics())]
+
+    encoders = [('json', encode_stdlib)]
+    if orjson:
+        encoders.append(('orjson', encode_orjson))
+
+    print(f'{"payload":<20} {"encoder":<7} {"encode ms":>10} {"raw":>9} {"gzip-6":>9} {"br-5":>9}')
+    for name, payload in payloads:
+        if orjson:
+            # Same values after decoding, only the bytes differ
+            assert json.loads(encode_stdlib(payload)) == json.loads(encode_orjson(payload))
+        for encoder_name, encoder in encoders:
+            body = encoder(payload)
+            gzipped = len(gzip.compress(body, compresslevel=6))
+            brotlied = len(brotli.compress(body, quality=5)) if brotli else '-'
+            print(f'{name:<20} {encoder_name:<7} {median_ms(encoder, payload):>10.2f} {len(body):>9} '
+                  f'{gzipped:>9} {brotlied:>9}')
+
+
+if __name__ == '__main__':
+    main()
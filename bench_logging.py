@@ -0,0 +1,85 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+THREADS = 8
+RECORDS_PER_THREAD = 5000
+FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+
+def make_file_handler(directory):
+    """File handler configured like the server's (10 MB segments, 10 backups)"""
+    file_handler = RotatingFileHandler(os.path.join(directory, 'app.log'), maxBytes=10000000, backupCount=10)
+    file_handler.setFormatter(logging.Formatter(FORMAT))
+    return file_handler
+
+
+def run(logger):
+    """Log from several threads at once and return per-call latencies in microseconds"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        local = []
+        for i in range(RECORDS_PER_THREAD):
+            started = time.perf_counter()
+            logger.info(f'SCHEDULE REQUESTED: worker {worker_id} requested schedule for record {i}')
+            local.append((time.perf_counter() - started) * 1000000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies):
+    mean = sum(latencies) / len(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f'{name:<10} mean {mean:8.2f} us   p99 {p99:8.2f} us   max {latencies[-1]:10.2f} us')
+
+
+def main():
+    print(f'{THREADS} threads x {RECORDS_PER_THREAD} records, per-call latency in the logging thread')
+
+    directory = tempfile.mkdtemp()
+    try:
+        logger = logging.getLogger('bench.sync')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(make_file_handler(directory))
+        report('sync', run(logger))
+    finally:
+        shutil.rmtree(directory)
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, make_file_handler(directory))
+        listener.start()
+
+        logger = logging.getLogger('bench.queue')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(QueueHandler(log_queue))
+        report('queue', run(logger))
+
+        started = time.perf_counter()
+        listener.stop()
+        print(f'queue drain after last call: {(time.perf_counter() - started) * 1000:.1f} ms')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
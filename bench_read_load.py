@@ -0,0 +1,100 @@
+"""
+Load test for the student/teacher read endpoints
+
+Keeps a fixed number of requests in flight against a running server and
+reports throughput and latency. Run it once against the thread-based
+deployment and once against the async one with the same token:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python bench_read_load.py --url http://127.0.0.1:5000 --token <jwt> --concurrency 500
+
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+    python bench_read_load.py --url http://127.0.0.1:5000 --token <jwt> --concurrency 500
+
+Use WEB_CONCURRENCY=1 for both to compare a single process.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+PATHS = ['/api/schedule?date=2025-02-03', '/api/profile', '/api/profile/details']
+
+
+async def request(host, port, path, token):
+    """One HTTP/1.1 GET on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n'
+                      f'Connection: close\r\n\r\n').encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client(host, port, paths, token, deadline, stats):
+    n = 0
+    while time.perf_counter() < deadline:
+        path = paths[n % len(paths)]
+        n += 1
+        started = time.perf_counter()
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            status = await request(host, port, path, token)
+        except (OSError, ValueError, IndexError):
+            status = None
+        finally:
+            stats['in_flight'] -= 1
+
+        if status == 200:
+            stats['latencies'].append(time.perf_counter() - started)
+        else:
+            stats['errors'][status] = stats['errors'].get(status, 0) + 1
+
+
+async def run(url, token, paths, concurrency, duration):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    stats = {'latencies': [], 'errors': {}, 'in_flight': 0, 'max_in_flight': 0}
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client(host, port, paths, token, deadline, stats) for _ in range(concurrency)))
+    return stats, time.perf_counter() - started
+
+
+def report(stats, elapsed):
+    latencies = sorted(stats['latencies'])
+    if not latencies:
+        print(f'no successful requests; errors by status: {stats["errors"]}')
+        return
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f'{len(latencies)} ok in {elapsed:.1f}s = {len(latencies) / elapsed:.0f} req/s, '
+          f'max in flight {stats["max_in_flight"]}')
+    print(f'latency p50 {percentile(0.5):.1f} ms   p99 {percentile(0.99):.1f} ms   max {latencies[-1] * 1000:.1f} ms')
+    if stats['errors']:
+        print(f'errors by status: {stats["errors"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--path', action='append', help='Request path (repeatable); defaults to the three read endpoints')
+    args = parser.parse_args()
+
+    print(f'{args.concurrency} concurrent clients for {args.duration:.0f}s against {args.url}')
+    report(*asyncio.run(run(args.url, args.token, args.path or PATHS, args.concurrency, args.duration)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+# pip install -r requirements.txt (gthread, wsgi:app) or requirements-asgi.txt (uvicorn worker, asgi:app)
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# Processes scale with cores; threads cover requests blocked on MySQL
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Import the app (and build the read model) once in the master, then fork
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers hand log records to the master, which stays the only writer of logs/app.log and its index
+os.environ.setdefault('LOG_SHARED_QUEUE', '1')
+
+# Each worker only needs a connection per thread plus one for the background writers
+os.environ.setdefault('DB_POOL_MAX_SIZE', str(threads + 2))
+
+
+def post_fork(server, worker):
+    from server import after_fork
+    after_fork()
@@ -1,48 +1,322 @@
+"""
+Versioned schema migrations
+
+    python mig.py            apply pending migrations
+    python mig.py status     list applied and pending migrations
+    python mig.py explain    check that the hot schedule queries use the migration indexes
+
+Connection settings come from schema.DB_CONFIG: DB_HOST, DB_USER and DB_PASSWORD
+must be set, DB_NAME defaults to timetable. Missing tables are created first; every index added after that lives
+here. Every step checks the catalog before changing anything, so a step that
+was interrupted half way can simply be run again.
+"""
+import sys
+import time
+
 import pymysql
 
+from schema import (DB_CONFIG, SCHEDULE_LESSON_QUERY, SCHEDULE_SEARCH_COLUMNS, USER_SEARCH_COLUMNS, create_tables,
+                    rebuild_schedule_rollup)
+
+# (version, description, up) in the order they are applied
+MIGRATIONS = []
+
+# Named lock serializing runners started by several workers at once
+MIGRATION_LOCK = 'timetable_schema_migrations'
+
+
+def migration(version, description):
+    """Register an up step"""
+
+    def register(up):
+        MIGRATIONS.append((version, description, up))
+        return up
+
+    return register
+
+
+# ============================================================
+# CATALOG HELPERS
+# ============================================================
+
+def column_exists(cursor, table, column):
+    cursor.execute('''
+        SELECT COUNT(*) as count
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone()['count'] > 0
+
+
+def index_exists(cursor, table, index_name):
+    cursor.execute('''
+        SELECT COUNT(*) as count
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    ''', (table, index_name))
+    return cursor.fetchone()['count'] > 0
+
+
+def column_nullable(cursor, table, column):
+    cursor.execute('''
+        SELECT IS_NULLABLE as nullable
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone()['nullable'] == 'YES'
+
+
+def add_index(cursor, table, index_name, columns):
+    """Build an index online (reads and writes continue while it is built)"""
+    if not index_exists(cursor, table, index_name):
+        cursor.execute(f'ALTER TABLE {table} ADD INDEX {index_name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE')
+
+
+def add_fulltext_index(cursor, table, index_name, columns):
+    """ngram FULLTEXT index without the InnoDB stopword list (FULLTEXT builds block writes)"""
+    if not index_exists(cursor, table, index_name):
+        cursor.execute('SET SESSION innodb_ft_enable_stopword = OFF')
+        try:
+            cursor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {index_name} ({columns}) WITH PARSER ngram, '
+                           f'ALGORITHM=INPLACE, LOCK=SHARED')
+        finally:
+            cursor.execute('SET SESSION innodb_ft_enable_stopword = DEFAULT')
+
+
+def drop_index(cursor, table, index_name):
+    if index_exists(cursor, table, index_name):
+        cursor.execute(f'ALTER TABLE {table} DROP INDEX {index_name}, ALGORITHM=INPLACE, LOCK=NONE')
+
+
+# ============================================================
+# MIGRATIONS
+# ============================================================
+
+@migration('0001', 'Add users.updated_at')
+def add_users_updated_at(cursor):
+    if not column_exists(cursor, 'users', 'updated_at'):
+        cursor.execute('''
+            ALTER TABLE users
+            ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ''')
+
+
+@migration('0002', 'Composite schedule indexes for group/teacher date-range reads')
+def add_schedule_date_indexes(cursor):
+    # Equality on the owner, range on date, rows already in (date, time_start) order;
+    # updated_at makes the ETag validator (COUNT, MAX(updated_at)) index-only
+    add_index(cursor, 'schedule', 'idx_schedule_group_date', 'group_name, date, time_start, updated_at')
+    add_index(cursor, 'schedule', 'idx_schedule_teacher_date', 'teacher_name, date, time_start, updated_at')
+
+
+@migration('0003', 'Composite schedule indexes for group/teacher semester reads')
+def add_schedule_semester_indexes(cursor):
+    add_index(cursor, 'schedule', 'idx_schedule_group_semester', 'group_name, semester, date, time_start, updated_at')
+    add_index(cursor, 'schedule', 'idx_schedule_teacher_semester',
+              'teacher_name, semester, date, time_start, updated_at')
+
+
+@migration('0004', 'Drop single-column schedule indexes covered by the composite ones')
+def drop_redundant_schedule_indexes(cursor):
+    drop_index(cursor, 'schedule', 'idx_group')
+    drop_index(cursor, 'schedule', 'idx_teacher')
+
+
+@migration('0005', 'Schedule indexes for delta sync by updated_at')
+def add_schedule_updated_indexes(cursor):
+    # /api/schedule/changes: equality on the owner, range on updated_at
+    add_index(cursor, 'schedule', 'idx_schedule_group_updated', 'group_name, updated_at')
+    add_index(cursor, 'schedule', 'idx_schedule_teacher_updated', 'teacher_name, updated_at')
+
+
+@migration('0006', 'Rebuild admin search FULLTEXT indexes without stopwords')
+def rebuild_search_indexes(cursor):
+    # Also creates them on new databases; the old ones were built with the default
+    # stopword list and dropped every bigram with 'a', 'i', ...
+    for table, index_name, columns in (('users', 'ft_users_search', USER_SEARCH_COLUMNS),
+                                       ('schedule', 'ft_schedule_search', SCHEDULE_SEARCH_COLUMNS)):
+        drop_index(cursor, table, index_name)
+        add_fulltext_index(cursor, table, index_name, ', '.join(columns))
 
-def run_migration():
-    """Direct database connection to add the updated_at column"""
-    # Connect directly to the database
-    connection = pymysql.connect(
-        host='147.45.153.76',
-        user='sanumxxx',
-        password='Yandex200515_',
-        database='timetable',
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
 
+@migration('0007', 'Indexes formerly created at server startup')
+def add_startup_indexes(cursor):
+    # Keyset pagination of the admin lists
+    add_index(cursor, 'users', 'idx_users_created', 'created_at, id')
+    add_index(cursor, 'schedule', 'idx_schedule_date_time', 'date, time_start, id')
+    add_index(cursor, 'admin_activity_log', 'idx_activity_created', 'created_at, id')
+    # Student/teacher lookups joined against schedule_teacher_groups
+    add_index(cursor, 'users', 'idx_users_group', 'group_name, user_type')
+    add_index(cursor, 'users', 'idx_users_teacher', 'teacher_name, user_type')
+    # Latest semester lookup used by teacher profile maintenance
+    add_index(cursor, 'schedule', 'idx_schedule_semester', 'semester')
+
+
+@migration('0008', 'Make schedule date and time_start NOT NULL')
+def require_schedule_sort_keys(cursor):
+    # Admin schedule keyset pages compare (date, time_start, id); NULL keys would end paging early
+    cursor.execute('SELECT COUNT(*) as count FROM schedule WHERE date IS NULL OR time_start IS NULL')
+    missing = cursor.fetchone()['count']
+    if missing:
+        raise RuntimeError(f'{missing} schedule rows have no date or time_start; fix or delete them and run again')
+
+    if column_nullable(cursor, 'schedule', 'date') or column_nullable(cursor, 'schedule', 'time_start'):
+        cursor.execute('ALTER TABLE schedule MODIFY date DATE NOT NULL, MODIFY time_start TIME NOT NULL, '
+                       'ALGORITHM=INPLACE, LOCK=NONE')
+
+
+@migration('0009', 'Keep NULL and empty values apart in schedule_rollup')
+def add_rollup_null_flag(cursor):
+    if not column_exists(cursor, 'schedule_rollup', 'value_is_null'):
+        cursor.execute('ALTER TABLE schedule_rollup ADD COLUMN value_is_null TINYINT(1) NOT NULL DEFAULT 0 AFTER value, '
+                       'DROP PRIMARY KEY, ADD PRIMARY KEY (dimension, semester, faculty, value, value_is_null)')
+    # Existing rows counted NULL under ''; recount them with the flag
+    rebuild_schedule_rollup(cursor)
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+def connect():
+    return pymysql.connect(**DB_CONFIG)
+
+
+def applied_versions(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(32) PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            duration_ms INT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+    cursor.execute('SELECT version, applied_at FROM schema_migrations')
+    return {row['version']: row['applied_at'] for row in cursor.fetchall()}
+
+
+def migrate():
+    """Create missing tables, then apply every migration that is not recorded yet"""
+    connection = connect()
     try:
         with connection.cursor() as cursor:
-            # Check if column already exists to avoid errors
-            cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM information_schema.columns 
-                WHERE table_schema = 'timetable'
-                AND table_name = 'users' 
-                AND column_name = 'updated_at'
-            """)
-            result = cursor.fetchone()
-
-            if result['count'] == 0:
-                # Column doesn't exist, create it with CURRENT_TIMESTAMP default and auto update
-                cursor.execute("""
-                    ALTER TABLE users
-                    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                """)
-                print("Migration completed: Added 'updated_at' column to users table")
-            else:
-                print("Column 'updated_at' already exists in users table")
-
-        # Commit the changes
-        connection.commit()
-
-    except Exception as e:
-        print(f"Error during migration: {e}")
+            cursor.execute('SELECT GET_LOCK(%s, 600) as locked', (MIGRATION_LOCK,))
+            if not cursor.fetchone()['locked']:
+                raise RuntimeError('Timed out waiting for another migration runner')
+
+            try:
+                create_tables(cursor)
+                connection.commit()
+
+                applied = applied_versions(cursor)
+                pending = [m for m in MIGRATIONS if m[0] not in applied]
+                if not pending:
+                    print('Schema is up to date')
+
+                for version, description, up in pending:
+                    started = time.monotonic()
+                    up(cursor)
+                    duration_ms = int((time.monotonic() - started) * 1000)
+                    cursor.execute(
+                        'INSERT INTO schema_migrations (version, description, duration_ms) VALUES (%s, %s, %s)',
+                        (version, description, duration_ms)
+                    )
+                    connection.commit()
+                    print(f'Applied {version}: {description} ({duration_ms} ms)')
+            finally:
+                cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK,))
+
     finally:
         connection.close()
 
 
+def status():
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            applied = applied_versions(cursor)
+        for version, description, _ in MIGRATIONS:
+            state = f'applied {applied[version]}' if version in applied else 'pending'
+            print(f'{version}  {state:<30} {description}')
+    finally:
+        connection.close()
+
+
+# ============================================================
+# EXPLAIN CHECKS
+# ============================================================
+
+# (name, query, params from the sample row, expected index, Extra must contain, Extra must not contain)
+EXPLAIN_CHECKS = [
+    ('group date range', SCHEDULE_LESSON_QUERY + 'WHERE group_name = %s AND date BETWEEN %s AND %s ORDER BY date, time_start',
+     ('group_name', 'date', 'date'), 'idx_schedule_group_date', None, 'filesort'),
+    ('teacher date range', SCHEDULE_LESSON_QUERY + 'WHERE teacher_name = %s AND date BETWEEN %s AND %s ORDER BY date, time_start',
+     ('teacher_name', 'date', 'date'), 'idx_schedule_teacher_date', None, 'filesort'),
+    ('group semester', SCHEDULE_LESSON_QUERY + 'WHERE group_name = %s AND semester = %s ORDER BY date, time_start',
+     ('group_name', 'semester'), 'idx_schedule_group_semester', None, 'filesort'),
+    ('teacher semester', SCHEDULE_LESSON_QUERY + 'WHERE teacher_name = %s AND semester = %s ORDER BY date, time_start',
+     ('teacher_name', 'semester'), 'idx_schedule_teacher_semester', None, 'filesort'),
+    ('group date validator', '''
+        SELECT COUNT(*) as count, MAX(updated_at) as last_updated FROM schedule
+        WHERE group_name = %s AND date BETWEEN %s AND %s
+     ''', ('group_name', 'date', 'date'), 'idx_schedule_group_date', 'Using index', None),
+    ('teacher date validator', '''
+        SELECT COUNT(*) as count, MAX(updated_at) as last_updated FROM schedule
+        WHERE teacher_name = %s AND date BETWEEN %s AND %s
+     ''', ('teacher_name', 'date', 'date'), 'idx_schedule_teacher_date', 'Using index', None),
+    ('group changes', SCHEDULE_LESSON_QUERY + 'WHERE group_name = %s AND updated_at >= %s ORDER BY date, time_start',
+     ('group_name', 'date'), 'idx_schedule_group_updated', None, None),
+    ('teacher changes', SCHEDULE_LESSON_QUERY + 'WHERE teacher_name = %s AND updated_at >= %s ORDER BY date, time_start',
+     ('teacher_name', 'date'), 'idx_schedule_teacher_updated', None, None),
+]
+
+
+def explain():
+    """Run EXPLAIN for each hot query shape; exit status 1 if any plan misses its index"""
+    connection = connect()
+    failures = 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('''
+                SELECT group_name, teacher_name, semester, date FROM schedule
+                WHERE group_name IS NOT NULL AND teacher_name IS NOT NULL AND semester IS NOT NULL
+                LIMIT 1
+            ''')
+            sample = cursor.fetchone()
+            if not sample:
+                print('Schedule table is empty, nothing to explain')
+                return 0
+
+            for name, query, fields, expected_key, required, forbidden in EXPLAIN_CHECKS:
+                cursor.execute('EXPLAIN ' + query, [sample[field] for field in fields])
+                plan = cursor.fetchone()
+                extra = plan.get('Extra') or ''
+
+                problems = []
+                if plan.get('key') != expected_key:
+                    problems.append(f"key {plan.get('key')}, expected {expected_key}")
+                if required and required not in extra:
+                    problems.append(f'Extra lacks "{required}"')
+                if forbidden and forbidden in extra:
+                    problems.append(f'Extra has "{forbidden}"')
+
+                failures += bool(problems)
+                print(f"{'FAIL' if problems else 'ok':<5} {name:<24} key={plan.get('key')} rows={plan.get('rows')} "
+                      f"extra={extra}" + (f"  ({'; '.join(problems)})" if problems else ''))
+    finally:
+        connection.close()
+
+    return 1 if failures else 0
+
+
 if __name__ == '__main__':
-    run_migration()
\ No newline at end of file
+    command = sys.argv[1] if len(sys.argv) > 1 else 'migrate'
+    if command == 'migrate':
+        migrate()
+    elif command == 'status':
+        status()
+    elif command == 'explain':
+        sys.exit(explain())
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,23 @@
+"""
+Password hashing jobs run in the PasswordHasher process pool
+
+Kept apart from server.py so that pool processes started by forkserver or
+spawn only import werkzeug, not the whole web application.
+"""
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def hash_password_job(password, method, submitted_at):
+    """Worker-process side of PasswordHasher.hash (returns the hash and seconds spent queued)"""
+    queued = time.time() - submitted_at
+    if method:
+        return generate_password_hash(password, method=method), queued
+    return generate_password_hash(password), queued
+
+
+def check_password_job(pwhash, password, submitted_at):
+    """Worker-process side of PasswordHasher.check"""
+    queued = time.time() - submitted_at
+    return check_password_hash(pwhash, password), queued
@@ -0,0 +1,278 @@
+"""
+Database settings, shared query constants and table bootstrap
+
+Imported by server.py and by mig.py, which must be able to run without
+loading the web application.
+"""
+import os
+
+import pymysql
+
+
+def required_env(name):
+    """Value of an environment variable that has no safe default; fail at startup when it is missing"""
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(f'{name} environment variable is not set')
+    return value
+
+
+# Database configuration (credentials only from the environment)
+DB_CONFIG = {
+    'host': required_env('DB_HOST'),
+    'user': required_env('DB_USER'),
+    'password': required_env('DB_PASSWORD'),
+    'db': os.environ.get('DB_NAME', 'timetable'),
+    'charset': 'utf8mb4',
+    'use_unicode': True,
+    'cursorclass': pymysql.cursors.DictCursor
+}
+
+# Columns returned to the mobile clients for a lesson
+SCHEDULE_LESSON_QUERY = '''
+    SELECT 
+        id,
+        DATE_FORMAT(date, '%%Y-%%m-%%d') as date,
+        TIME_FORMAT(time_start, '%%H:%%i') as time_start,
+        TIME_FORMAT(time_end, '%%H:%%i') as time_end,
+        subject,
+        lesson_type,
+        subgroup,
+        group_name,
+        teacher_name,
+        auditory,
+        semester,
+        week_number,
+        course,
+        faculty,
+        weekday
+    FROM schedule 
+'''
+
+# Columns covered by the ft_users_search / ft_schedule_search FULLTEXT indexes
+USER_SEARCH_COLUMNS = ('full_name', 'email', 'group_name', 'teacher_name')
+SCHEDULE_SEARCH_COLUMNS = ('group_name', 'subject', 'teacher_name', 'auditory')
+
+# Schedule columns counted in schedule_rollup, keyed by semester and faculty
+ROLLUP_DIMENSIONS = ('weekday', 'lesson_type', 'teacher_name', 'subject')
+
+# NULL semester/faculty/value are stored as 0 / '' so they can be part of the primary key;
+# value_is_null keeps a NULL value apart from a real ''
+SCHEDULE_ROLLUP_SELECT = '''
+    SELECT IFNULL(semester, 0) as semester_key, IFNULL(faculty, '') as faculty_key,
+        '{dimension}' as dimension, IFNULL(CAST({dimension} AS CHAR), '') as value_key,
+        {dimension} IS NULL as value_is_null
+    FROM schedule
+'''
+
+
+def column_collation(cursor, table, column):
+    """(character set, collation) of a column, or None if it does not exist"""
+    cursor.execute('''
+        SELECT CHARACTER_SET_NAME as charset, COLLATION_NAME as collation
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    row = cursor.fetchone()
+    return (row['charset'], row['collation']) if row else None
+
+
+def create_tables(cursor):
+    """Create missing tables (indexes added after a table was introduced live in mig.py migrations)"""
+    # Set encoding
+    cursor.execute('SET NAMES utf8mb4')
+    cursor.execute('SET CHARACTER SET utf8mb4')
+    cursor.execute('SET character_set_connection=utf8mb4')
+
+    # Create users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            full_name VARCHAR(255) NOT NULL,
+            user_type ENUM('student', 'teacher', 'admin') NOT NULL,
+            group_name VARCHAR(255),
+            teacher_name VARCHAR(255),
+            status VARCHAR(50) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Create schedule table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            semester INT,
+            week_number INT,
+            group_name VARCHAR(255),
+            course INT,
+            faculty VARCHAR(255),
+            subject VARCHAR(255),
+            lesson_type VARCHAR(50),
+            subgroup INT,
+            date DATE NOT NULL,
+            time_start TIME NOT NULL,
+            time_end TIME,
+            weekday INT,
+            teacher_name VARCHAR(255),
+            auditory VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_date (date),
+            INDEX idx_group (group_name),
+            INDEX idx_teacher (teacher_name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Create notifications table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            message TEXT NOT NULL,
+            is_read BOOLEAN DEFAULT FALSE,
+            data JSON,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Create admin activity log table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admin_activity_log (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            admin_id INT NOT NULL,
+            admin_name VARCHAR(255) NOT NULL,
+            action VARCHAR(255) NOT NULL,
+            details TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (admin_id) REFERENCES users(id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Create group/teacher dictionaries maintained by the schedule write routes
+    for table in ('schedule_groups', 'schedule_teachers'):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                name VARCHAR(255) PRIMARY KEY,
+                lesson_count INT NOT NULL DEFAULT 0
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        ''')
+
+    # Teacher <-> group adjacency, collated like the users columns it is joined with
+    name_collations = {
+        'teacher_name': column_collation(cursor, 'users', 'teacher_name'),
+        'group_name': column_collation(cursor, 'users', 'group_name')
+    }
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_teacher_groups (
+            teacher_name VARCHAR(255) CHARACTER SET {0} COLLATE {1} NOT NULL,
+            group_name VARCHAR(255) CHARACTER SET {2} COLLATE {3} NOT NULL,
+            lesson_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (teacher_name, group_name),
+            INDEX idx_teacher_groups_group (group_name, teacher_name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    '''.format(*name_collations['teacher_name'], *name_collations['group_name']))
+    for column, (charset, collation) in name_collations.items():
+        if column_collation(cursor, 'schedule_teacher_groups', column) != (charset, collation):
+            cursor.execute(f'ALTER TABLE schedule_teacher_groups MODIFY {column} '
+                           f'VARCHAR(255) CHARACTER SET {charset} COLLATE {collation} NOT NULL')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dictionary_versions (
+            name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+    cursor.execute("INSERT IGNORE INTO dictionary_versions (name, version) VALUES ('groups', 0), ('teachers', 0)")
+
+    # Create group/teacher profile metadata maintained by the schedule write routes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_profiles (
+            kind ENUM('group', 'teacher') NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            faculty VARCHAR(255),
+            course INT,
+            semester INT,
+            total_subjects INT NOT NULL DEFAULT 0,
+            total_days INT NOT NULL DEFAULT 0,
+            total_groups INT NOT NULL DEFAULT 0,
+            total_lessons INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Create analytics rollups maintained by the schedule/user write routes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_rollup (
+            dimension VARCHAR(32) NOT NULL,
+            semester INT NOT NULL,
+            faculty VARCHAR(255) NOT NULL,
+            value VARCHAR(255) NOT NULL,
+            value_is_null TINYINT(1) NOT NULL DEFAULT 0,
+            lesson_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, semester, faculty, value, value_is_null)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_rollup (
+            month CHAR(7) NOT NULL,
+            user_type VARCHAR(16) NOT NULL,
+            user_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, user_type)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Users deleted or edited by admins, polled by every process to drop cached identities/tokens
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_invalidations (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_user_invalidations_created (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Cached schedule days changed by admin writes (filter_column NULL: every day, after imports)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_invalidations (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            filter_column VARCHAR(16) NULL,
+            filter_value VARCHAR(255) NULL,
+            day DATE NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_schedule_invalidations_created (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+    # Lessons deleted or moved to another group/teacher, for /api/schedule/changes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_tombstones (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            schedule_id INT NOT NULL,
+            group_name VARCHAR(255),
+            teacher_name VARCHAR(255),
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_tombstones_group (group_name, deleted_at),
+            INDEX idx_tombstones_teacher (teacher_name, deleted_at),
+            INDEX idx_tombstones_deleted (deleted_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    ''')
+
+
+def rebuild_schedule_rollup(cursor):
+    """Recompute schedule_rollup from the schedule table"""
+    cursor.execute('DELETE FROM schedule_rollup')
+    for dimension in ROLLUP_DIMENSIONS:
+        cursor.execute(f'''
+            INSERT INTO schedule_rollup (semester, faculty, dimension, value, value_is_null, lesson_count)
+            SELECT semester_key, faculty_key, dimension, value_key, value_is_null, COUNT(*)
+            FROM ({SCHEDULE_ROLLUP_SELECT.format(dimension=dimension)}) AS lessons
+            GROUP BY semester_key, faculty_key, dimension, value_key, value_is_null
+            ON DUPLICATE KEY UPDATE lesson_count = lesson_count + VALUES(lesson_count)
+        ''')
@@ -1,14 +1,46 @@
+import atexit
+import base64
+import codecs
+import csv
+import gzip
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
+import queue
 import re
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from functools import wraps
-from logging.handlers import RotatingFileHandler
-from flask import Flask, request, jsonify, render_template_string, send_file
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import Flask, g, has_request_context, request, jsonify, render_template_string, send_file
+from flask.json.provider import DefaultJSONProvider
 import jwt
 import pymysql
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
+
+from password_jobs import check_password_job, hash_password_job
+from schema import (DB_CONFIG, ROLLUP_DIMENSIONS, SCHEDULE_LESSON_QUERY, SCHEDULE_ROLLUP_SELECT, SCHEDULE_SEARCH_COLUMNS,
+                    USER_SEARCH_COLUMNS, create_tables, rebuild_schedule_rollup)
+
+# Optional accelerators: without them responses use the stdlib encoder and gzip only
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # ============================================================
 # CONFIGURATION
@@ -16,130 +48,662 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 # Initialize Flask application
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag', 'X-Next-Cursor'])
 
 # App configuration
 app.config['SECRET_KEY'] = 'your-secret-key'  # Change to real secret key
 app.config['JWT_EXPIRATION_DAYS'] = 30
 app.config['LOG_FILENAME'] = 'app.log'
-
-# Database configuration
-DB_CONFIG = {
-    'host': '147.45.153.76',
-    'user': 'sanumxxx',
-    'password': 'Yandex200515_',
-    'db': 'timetable',
-    'charset': 'utf8mb4',
-    'use_unicode': True,
-    'cursorclass': pymysql.cursors.DictCursor
+app.config['LOG_QUEUE'] = os.environ.get('LOG_QUEUE', '1') == '1'  # Write log records from a listener thread
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'text')  # 'text' or 'json'
+app.config['LOG_SHARED_QUEUE'] = os.environ.get('LOG_SHARED_QUEUE', '0') == '1'  # Forked workers log via the master
+app.config['IDENTITY_CACHE_SIZE'] = 10000
+app.config['IDENTITY_CACHE_TTL'] = 60  # Seconds a cached user identity stays valid
+app.config['TOKEN_CACHE_SIZE'] = 10000
+app.config['TOKEN_CACHE_TTL'] = 300  # Upper bound on how long a verified token skips jwt.decode
+# Seconds before another worker process drops the cached identity/tokens of a deleted or edited user
+app.config['USER_INVALIDATION_POLL_INTERVAL'] = float(os.environ.get('USER_INVALIDATION_POLL_INTERVAL', 1))
+app.config['USER_INVALIDATION_OVERLAP'] = 30  # Seconds re-read each poll to catch rows committed out of order
+app.config['SCHEDULE_READ_MODEL'] = os.environ.get('SCHEDULE_READ_MODEL', '0') == '1'
+app.config['SCHEDULE_READ_MODEL_REFRESH'] = 30  # Seconds between incremental refreshes
+app.config['SCHEDULE_READ_MODEL_RELOAD'] = 900  # Seconds between full reloads (catches foreign deletes)
+app.config['DICTIONARY_CHECK_INTERVAL'] = 5  # Seconds before cached group/teacher lists are revalidated
+app.config['ACTIVITY_LOG_QUEUE_SIZE'] = 10000  # Pending admin activity rows before new ones are dropped
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = 200
+app.config['ACTIVITY_LOG_FLUSH_INTERVAL'] = 1.0  # Seconds the writer waits for more rows
+app.config['SCHEDULE_IMPORT_CHUNK_SIZE'] = 1000  # Rows per multi-row upsert and transaction
+app.config['SCHEDULE_IMPORT_MAX_ERRORS'] = 1000  # Row errors included in the import report
+app.config['DASHBOARD_STATS_TTL'] = 30  # Seconds dashboard counters are served from memory
+app.config['READINESS_TIMEOUT'] = 2  # Seconds /readyz waits for a database connection
+app.config['SCHEDULE_RESPONSE_CACHE_BYTES'] = int(os.environ.get('SCHEDULE_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+app.config['SCHEDULE_RESPONSE_CACHE_TTL'] = 300  # Backstop expiry; writes arrive via schedule_invalidations
+# Seconds before another worker process drops cached schedule days touched by a write
+app.config['SCHEDULE_INVALIDATION_POLL_INTERVAL'] = float(os.environ.get('SCHEDULE_INVALIDATION_POLL_INTERVAL', 1))
+app.config['SCHEDULE_INVALIDATION_OVERLAP'] = 30  # Seconds re-read each poll to catch rows committed out of order
+app.config['SCHEDULE_RESPONSE_CACHE_MAX_DAYS'] = 31  # Longer windows bypass the cache
+app.config['SCHEDULE_TOMBSTONE_RETENTION_DAYS'] = 90  # Older sync cursors get a full refetch
+app.config['SCHEDULE_CHANGES_OVERLAP'] = 5  # Seconds re-sent each sync to cover writes committed after updated_at
+app.config['COMPRESS_MIN_SIZE'] = 1024  # Bytes below which responses are sent uncompressed
+app.config['COMPRESS_GZIP_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 5
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Hashing processes
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))  # Running + queued
+app.config['PASSWORD_HASH_TIMEOUT'] = 5  # Seconds a request waits for a hashing slot
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD')  # None uses the werkzeug default
+
+
+# Connection pool configuration
+DB_POOL_CONFIG = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # Seconds to wait for a free connection
+    'recycle': int(os.environ.get('DB_POOL_RECYCLE', 3600)),  # Max connection age in seconds
+    'ping_interval': int(os.environ.get('DB_POOL_PING_INTERVAL', 30))  # Idle seconds before liveness check
 }
 
 # ============================================================
 # LOGGING SETUP
 # ============================================================
 
+class IndexedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that keeps a sidecar time index for every log segment
+
+    Each segment (app.log, app.log.1, ...) gets a <segment>.idx file listing
+    coarse blocks of byte offsets with their timestamp range and level counts,
+    so date-bounded reads can seek straight to the bytes that can match.
+    Blocks with unknown timestamps (first/last None) cover bytes written
+    before the index existed and must always be scanned.
+
+    Only the process that writes the file (writer_pid) keeps the in-memory
+    index; forked workers logging through the master see the file grow
+    without it and read the persisted index instead.
+    """
+
+    def __init__(self, filename, block_bytes=262144, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.block_bytes = block_bytes
+        self.writer_pid = os.getpid()
+        self._blocks = self._load_current_index()
+        self._block = None  # Block currently being written
+
+    @property
+    def is_writer(self):
+        return os.getpid() == self.writer_pid
+
+    def claim_writer(self):
+        """Make the current (forked) process the writer, starting from the persisted index"""
+        self.acquire()
+        try:
+            self.writer_pid = os.getpid()
+            self._blocks = self._load_current_index()
+            self._block = None
+        finally:
+            self.release()
+
+    @staticmethod
+    def index_path(path):
+        return path + '.idx'
+
+    @classmethod
+    def load_index(cls, path):
+        """Blocks of a segment's sidecar index, or None when it has none"""
+        try:
+            with open(cls.index_path(path), 'r', encoding='utf-8') as file:
+                return json.load(file)['blocks']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _load_current_index(self):
+        blocks = self.load_index(self.baseFilename) or []
+        size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        indexed_end = blocks[-1]['end'] if blocks else 0
+
+        if indexed_end > size:
+            # The file was replaced behind our back; the old index is meaningless
+            blocks, indexed_end = [], 0
+        if size > indexed_end:
+            blocks.append({'offset': indexed_end, 'end': size, 'first': None, 'last': None, 'levels': {}})
+        return blocks
+
+    def _save_index(self):
+        blocks = self._blocks + ([self._block] if self._block else [])
+        tmp_path = self.index_path(self.baseFilename) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'blocks': blocks}, file)
+        os.replace(tmp_path, self.index_path(self.baseFilename))
+
+    def _index_record(self, offset, end, record):
+        block = self._block
+        if block is None or block['end'] - block['offset'] >= self.block_bytes:
+            if block is not None:
+                self._blocks.append(block)
+                self._save_index()
+            block = self._block = {'offset': offset, 'end': end, 'first': record.created,
+                                   'last': record.created, 'levels': {}}
+
+        block['end'] = end
+        block['first'] = min(block['first'], record.created)
+        block['last'] = max(block['last'], record.created)
+        block['levels'][record.levelname] = block['levels'].get(record.levelname, 0) + 1
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            offset = self.stream.tell()
+            logging.FileHandler.emit(self, record)
+            self._index_record(offset, self.stream.tell(), record)
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        if self._block is not None:
+            self._blocks.append(self._block)
+            self._block = None
+        self._save_index()
+
+        super().doRollover()
+
+        # Shift sidecar indexes exactly like the segments they describe
+        current_index = self.index_path(self.baseFilename)
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 0, -1):
+                source = self.index_path(self.rotation_filename(f'{self.baseFilename}.{i}'))
+                if os.path.exists(source):
+                    os.replace(source, self.index_path(self.rotation_filename(f'{self.baseFilename}.{i + 1}')))
+            if os.path.exists(current_index):
+                os.replace(current_index, self.index_path(self.rotation_filename(f'{self.baseFilename}.1')))
+        elif os.path.exists(current_index):
+            os.remove(current_index)
+
+        self._blocks = []
+
+    def close(self):
+        self.acquire()
+        try:
+            # A non-writer's blocks stopped at fork; saving them would truncate the writer's index
+            if self.is_writer and (self._blocks or self._block):
+                self._save_index()
+        except OSError:
+            pass
+        finally:
+            self.release()
+        super().close()
+
+    def segment_index(self, path):
+        """Blocks for a segment: live state for the current file, the sidecar for backups"""
+        if os.path.abspath(path) != self.baseFilename:
+            return self.load_index(path)
+        if not self.is_writer:
+            # Persisted blocks plus an unknown block for everything written past them
+            return self._load_current_index()
+
+        self.acquire()
+        try:
+            return [dict(block) for block in self._blocks] + ([dict(self._block)] if self._block else [])
+        finally:
+            self.release()
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach route, method, user id and elapsed request time to records (runs in the request thread)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'route'):
+            if has_request_context():
+                user = g.get('current_user')
+                started = g.get('request_started')
+                record.route = request.path
+                record.method = request.method
+                record.user_id = user['id'] if user else None
+                record.duration_ms = round((time.perf_counter() - started) * 1000, 2) if started else None
+            else:
+                record.route = record.method = record.user_id = record.duration_ms = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; 'time' comes first so lines still start with the timestamp"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'route': getattr(record, 'route', None),
+            'method': getattr(record, 'method', None),
+            'user_id': getattr(record, 'user_id', None),
+            'duration_ms': getattr(record, 'duration_ms', None),
+            'status': getattr(record, 'status', None),
+            'source': f'{record.pathname}:{record.lineno}'
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ProcessLogQueue:
+    """
+    Log record queue shared with forked worker processes
+
+    Workers write pickled records into a pipe; the listener thread of the
+    process that created the queue (the preloading master) stays the only
+    writer of the log file and its index. Pipe writes block while the master
+    drains it, so in workers put_nowait only hands records to an in-process
+    queue and a forwarder thread does the writing.
+    """
+
+    def __init__(self):
+        self._queue = multiprocessing.SimpleQueue()
+        self._owner_pid = os.getpid()
+        self._local = None
+        self._local_pid = None
+        self._forwarder = None
+
+    def reset(self):
+        """Start the forwarder of the current (forked) process"""
+        self._local = queue.Queue(-1)
+        self._local_pid = os.getpid()
+        self._forwarder = threading.Thread(target=self._forward, args=(self._local,), name='log-forwarder',
+                                           daemon=True)
+        self._forwarder.start()
+        atexit.register(self.flush)
+
+    def _forward(self, local):
+        while True:
+            record = local.get()
+            if record is None:
+                return
+            self._queue.put(record)
+
+    def flush(self, timeout=5):
+        """Forward records still buffered in this process (registered at exit)"""
+        if self._local_pid == os.getpid():
+            self._local.put(None)
+            self._forwarder.join(timeout)
+
+    def put_nowait(self, record):
+        if os.getpid() == self._owner_pid:
+            # The master's own listener thread drains the pipe
+            self._queue.put(record)
+            return
+        if self._local_pid != os.getpid():
+            self.reset()
+        self._local.put_nowait(record)
+
+    def get(self, block=True):
+        return self._queue.get()
+
+
 # Setup logging
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
-formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-handler = RotatingFileHandler(f"logs/{app.config['LOG_FILENAME']}", maxBytes=10000000, backupCount=10)
+if app.config['LOG_FORMAT'] == 'json':
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+handler = IndexedRotatingFileHandler(f"logs/{app.config['LOG_FILENAME']}", maxBytes=10000000, backupCount=10)
 handler.setFormatter(formatter)
-app.logger.addHandler(handler)
+
+if app.config['LOG_QUEUE']:
+    # Request threads only enqueue; the listener thread formats and writes
+    log_queue = ProcessLogQueue() if app.config['LOG_SHARED_QUEUE'] else queue.Queue(-1)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    app.logger.addHandler(queue_handler)
+    log_listener = QueueListener(log_queue, handler)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+else:
+    handler.addFilter(RequestContextFilter())
+    app.logger.addHandler(handler)
+
 app.logger.setLevel(logging.INFO)
 app.logger.info('Server startup')
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def log_request(response):
+    """Structured access record per request (json log format only)"""
+    if app.config['LOG_FORMAT'] == 'json':
+        app.logger.info(f'REQUEST: {request.method} {request.path} {response.status_code}',
+                        extra={'status': response.status_code})
+    return response
+
+
+# ============================================================
+# RESPONSE ENCODING
+# ============================================================
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider encoding with orjson
+
+    Output decodes to the same values as the default provider: keys sorted,
+    datetime/date as HTTP dates and Decimal as strings through the same
+    default hook. Non-ASCII text is sent as UTF-8 rather than ASCII escapes.
+    """
+
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        option = self.options
+        kwargs.pop('separators', None)  # orjson output is always compact
+        if kwargs.pop('indent', None):
+            option |= orjson.OPT_INDENT_2
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            # Values orjson refuses (e.g. integers beyond 64 bits) get the stdlib encoder's verdict
+            return super().dumps(obj)
+
+
+if orjson is not None:
+    app.json = FastJSONProvider(app)
+
+# Content types worth compressing
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/csv'}
+
+
+def compress_body(data, accept_encodings):
+    """
+    Compress data with the best encoding the client accepts
+
+    Returns (body, encoding); encoding is None when the body stays as it is
+    (too small, nothing acceptable, or no gain).
+    """
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return data, None
+
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        body, encoding = brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY']), 'br'
+    elif accept_encodings.quality('gzip') > 0:
+        body, encoding = gzip.compress(data, compresslevel=app.config['COMPRESS_GZIP_LEVEL']), 'gzip'
+    else:
+        return data, None
+
+    return (body, encoding) if len(body) < len(data) else (data, None)
+
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode buffered text responses above COMPRESS_MIN_SIZE"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body, encoding = compress_body(response.get_data(), request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+
+    # The encoded bytes differ, so a strong validator becomes weak (If-None-Match compares weakly)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 # ============================================================
 # DATABASE FUNCTIONS
 # ============================================================
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class PooledConnection:
+    """Connection proxy that returns the connection to its pool on close()"""
+
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn, self._created_at)
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable MySQL connections"""
+
+    def __init__(self, db_config, min_size=2, max_size=20, timeout=10, recycle=3600, ping_interval=30):
+        self._db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, created_at, last_used)
+        self._size = 0  # Open connections, idle and borrowed
+        self._waiting = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'connections_broken': 0
+        }
+
+    def _connect(self):
+        conn = pymysql.connect(**self._db_config)
+        with self._cond:
+            self._stats['connections_created'] += 1
+        return conn, time.monotonic()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def warm_up(self):
+        """Open connections until the pool holds min_size of them"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn, created_at = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, created_at, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, waiting up to timeout (default self.timeout) seconds for a free one"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO keeps the most recently used connections warm
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(f'No database connection available within {timeout}s')
+
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            wait_time = time.monotonic() - start
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+        try:
+            if conn is None:
+                conn, created_at = self._connect()
+            else:
+                conn, created_at = self._validate(conn, created_at, last_used)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, conn, created_at)
+
+    def _validate(self, conn, created_at, last_used):
+        """Recycle stale connections and ping ones that sat idle for a while"""
+        now = time.monotonic()
+
+        if now - created_at > self.recycle:
+            self._close_quietly(conn)
+            with self._cond:
+                self._stats['connections_recycled'] += 1
+            return self._connect()
+
+        if now - last_used > self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(conn)
+                with self._cond:
+                    self._stats['connections_broken'] += 1
+                return self._connect()
+
+        return conn, created_at
+
+    def release(self, conn, created_at):
+        """Return a borrowed connection to the pool"""
+        try:
+            # End any open transaction so the next borrower gets a fresh snapshot
+            conn.rollback()
+            healthy = conn.open
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            if healthy:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+                self._stats['connections_broken'] += 1
+            self._cond.notify()
+
+        if not healthy:
+            self._close_quietly(conn)
+
+    def reset(self, close_idle=True):
+        """
+        Close idle connections and forget borrowed ones
+
+        After a fork pass close_idle=False: the sockets still belong to the
+        parent, and closing them here would end its sessions.
+        """
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size = 0
+            self._cond.notify_all()
+
+        if close_idle:
+            for conn, _, _ in idle:
+                self._close_quietly(conn)
+
+    def stats(self):
+        """Snapshot of pool size and wait metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            })
+
+        checkouts_waited = stats['waits']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts_waited if checkouts_waited else 0.0
+        return stats
+
+
+db_pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+
+
 def get_db():
-    """Get database connection"""
-    return pymysql.connect(**DB_CONFIG)
+    """Borrow a database connection from the pool (close() returns it)"""
+    return db_pool.acquire()
 
 
-def init_db():
-    """Initialize database tables"""
-    conn = get_db()
-    cursor = conn.cursor()
+def backfill_derived_tables(cursor):
+    """Fill derived tables that are still empty (first start after they were introduced)"""
+    cursor.execute('SELECT COUNT(*) as count FROM schedule_groups')
+    if cursor.fetchone()['count'] == 0:
+        rebuild_dictionaries(cursor)
 
-    try:
-        # Set encoding
-        cursor.execute('SET NAMES utf8mb4')
-        cursor.execute('SET CHARACTER SET utf8mb4')
-        cursor.execute('SET character_set_connection=utf8mb4')
+    cursor.execute('SELECT COUNT(*) as count FROM schedule_teacher_groups')
+    if cursor.fetchone()['count'] == 0:
+        rebuild_teacher_groups(cursor)
 
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                full_name VARCHAR(255) NOT NULL,
-                user_type ENUM('student', 'teacher', 'admin') NOT NULL,
-                group_name VARCHAR(255),
-                teacher_name VARCHAR(255),
-                status VARCHAR(50) DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        ''')
+    cursor.execute('SELECT COUNT(*) as count FROM schedule_profiles')
+    if cursor.fetchone()['count'] == 0:
+        rebuild_profiles(cursor)
 
-        # Create schedule table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS schedule (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                semester INT,
-                week_number INT,
-                group_name VARCHAR(255),
-                course INT,
-                faculty VARCHAR(255),
-                subject VARCHAR(255),
-                lesson_type VARCHAR(50),
-                subgroup INT,
-                date DATE,
-                time_start TIME,
-                time_end TIME,
-                weekday INT,
-                teacher_name VARCHAR(255),
-                auditory VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                INDEX idx_date (date),
-                INDEX idx_group (group_name),
-                INDEX idx_teacher (teacher_name)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        ''')
+    cursor.execute('SELECT COUNT(*) as count FROM user_rollup')
+    if cursor.fetchone()['count'] == 0:
+        rebuild_rollups(cursor)
 
-        # Create notifications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                type VARCHAR(50) NOT NULL,
-                title VARCHAR(255) NOT NULL,
-                message TEXT NOT NULL,
-                is_read BOOLEAN DEFAULT FALSE,
-                data JSON,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        ''')
 
-        # Create admin activity log table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admin_activity_log (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                admin_id INT NOT NULL,
-                admin_name VARCHAR(255) NOT NULL,
-                action VARCHAR(255) NOT NULL,
-                details TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (admin_id) REFERENCES users(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-        ''')
+def init_db():
+    """Create missing tables and backfill derived data; indexes come from `python mig.py`"""
+    conn = get_db()
+    cursor = conn.cursor()
 
+    try:
+        create_tables(cursor)
+        backfill_derived_tables(cursor)
         conn.commit()
         app.logger.info('Database initialized successfully')
 
@@ -167,6 +731,370 @@ def generate_token(user_id):
         raise e
 
 
+class PasswordHasherBusyError(Exception):
+    """Raised when the hashing pool has no free slot in time"""
+
+
+class PasswordHasher:
+    """
+    Password key derivation in a separate process pool
+
+    Request threads block on the result but no longer hold the GIL while the
+    hash is computed. At most max_pending jobs are admitted (running + queued);
+    callers beyond that wait up to timeout seconds for a slot.
+    """
+
+    def __init__(self, workers=2, max_pending=16, timeout=5, method=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.method = method
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        # Pool processes start from a clean interpreter: forking a threaded worker could copy held locks
+        start_methods = multiprocessing.get_all_start_methods()
+        self._mp_context = multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+        if self._mp_context.get_start_method() == 'forkserver':
+            self._mp_context.set_forkserver_preload(['password_jobs'])
+        # Method/parameters part of hashes made now; one local hash at startup instead of a pool job per process
+        self._current_prefix = (generate_password_hash('', method=method) if method
+                                else generate_password_hash('')).split('$', 1)[0]
+        self._stats = {
+            'jobs': 0,
+            'rejected': 0,
+            'rehashed': 0,
+            'pool_restarts': 0,
+            'queue_time_total': 0.0,
+            'queue_time_max': 0.0,
+            'run_time_total': 0.0
+        }
+
+    def _get_executor(self):
+        # A forked worker must not reuse the parent's pool processes
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._mp_context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drop a broken pool; the next _get_executor builds a new one"""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False)
+                self._executor = None
+                self._stats['pool_restarts'] += 1
+
+    def _run(self, job, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise PasswordHasherBusyError(f'No password hashing slot available within {self.timeout}s')
+
+        try:
+            started = time.time()
+            executor = self._get_executor()
+            try:
+                result, queued = executor.submit(job, *args, started).result()
+            except BrokenProcessPool:
+                # A pool process died (OOM kill, crash); replace the pool and retry once
+                app.logger.warning('Password hashing pool broken, restarting it')
+                self._discard_executor(executor)
+                result, queued = self._get_executor().submit(job, *args, started).result()
+            elapsed = time.time() - started
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self._stats['jobs'] += 1
+            self._stats['queue_time_total'] += queued
+            self._stats['queue_time_max'] = max(self._stats['queue_time_max'], queued)
+            self._stats['run_time_total'] += elapsed - queued
+        return result
+
+    def hash(self, password):
+        return self._run(hash_password_job, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(check_password_job, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when pwhash was made with other parameters than hash() uses now"""
+        return pwhash.split('$', 1)[0] != self._current_prefix
+
+    def record_rehash(self):
+        with self._lock:
+            self._stats['rehashed'] += 1
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        jobs = stats['jobs']
+        stats.update({
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'queue_time_avg': stats['queue_time_total'] / jobs if jobs else 0.0,
+            'run_time_avg': stats['run_time_total'] / jobs if jobs else 0.0
+        })
+        return stats
+
+
+password_hasher = PasswordHasher(
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    method=app.config['PASSWORD_HASH_METHOD']
+)
+atexit.register(password_hasher.shutdown)
+
+
+class IdentityCache:
+    """Bounded LRU cache of user identity rows with per-entry TTL"""
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, identity)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, user_id, identity):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(identity))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL'])
+
+
+# Identity fields handlers read from g.current_user
+IDENTITY_QUERY = '''
+    SELECT id, full_name, user_type, group_name, teacher_name, status
+    FROM users WHERE id = %s
+'''
+
+
+def load_identity(user_id):
+    """
+    Get user identity (id, full_name, user_type, group_name, teacher_name, status)
+
+    Served from identity_cache when possible; returns None for unknown users.
+    """
+    user_invalidations.refresh()
+    identity = identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(IDENTITY_QUERY, (user_id,))
+        identity = cursor.fetchone()
+    finally:
+        conn.close()
+
+    if identity:
+        identity_cache.put(user_id, identity)
+    return identity
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads keyed by token digest
+
+    An entry lives until the token's exp (capped at ttl seconds), so expired
+    tokens always fall through to jwt.decode and get its error.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (expires_at, payload)
+        self._by_user = {}  # user_id -> {digest}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, token, payload):
+        key = self.digest(token)
+        expires_at = time.time() + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(payload.get('user_id'), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def revoke_user(self, user_id):
+        """Evict every cached token of a user"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1].get('user_id')
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+
+token_cache = TokenCache(app.config['TOKEN_CACHE_SIZE'], app.config['TOKEN_CACHE_TTL'])
+
+
+def decode_token(token):
+    """Verify a JWT and return its payload, skipping the signature check for recently verified tokens"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        token_cache.put(token, payload)
+    return payload
+
+
+USER_INVALIDATION_QUERY = 'SELECT id, user_id, created_at FROM user_invalidations WHERE created_at >= %s ORDER BY id'
+
+
+class InvalidationFeed:
+    """
+    Cross-process eviction of in-process caches through a polled table
+
+    Writers append rows describing what changed (user_invalidations,
+    schedule_invalidations). Each process passes new rows to handler at most
+    every interval seconds from the request path, so a write made by one
+    worker reaches the caches of every worker within that bound rather than
+    after the cache TTL.
+
+    Ids are assigned at insert but become visible at commit, so a poll by id
+    could skip a row committed after a higher id. Polls instead re-read the
+    last overlap seconds by created_at and skip rows already applied.
+    """
+
+    def __init__(self, name, query, handler, interval=1.0, overlap=30):
+        self.name = name
+        self.query = query
+        self.handler = handler
+        self.interval = interval
+        self.overlap = timedelta(seconds=overlap)
+        self._lock = threading.Lock()
+        self._since = datetime(1970, 1, 1)
+        self._applied = {}  # id -> created_at of rows inside the overlap window
+        self._next_poll = 0.0
+
+    def claim(self):
+        """created_at to poll from when a poll is due (only one caller gets it), otherwise None"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_poll:
+                return None
+            self._next_poll = now + self.interval
+            return self._since
+
+    def apply(self, rows):
+        with self._lock:
+            fresh = [row for row in rows if row['id'] not in self._applied]
+            if rows:
+                self._since = max(self._since, max(row['created_at'] for row in rows) - self.overlap)
+            self._applied.update((row['id'], row['created_at']) for row in fresh)
+            self._applied = {row_id: created_at for row_id, created_at in self._applied.items()
+                             if created_at >= self._since}
+
+        if fresh:
+            self.handler(fresh)
+
+    def refresh(self):
+        since = self.claim()
+        if since is None:
+            return
+        try:
+            conn = get_db()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(self.query, (since,))
+                self.apply(cursor.fetchall())
+            finally:
+                conn.close()
+        except Exception as e:
+            app.logger.warning(f'{self.name} invalidation poll error: {str(e)}')
+
+
+def invalidate_users(rows):
+    """InvalidationFeed handler for user_invalidations rows"""
+    for row in rows:
+        token_cache.revoke_user(row['user_id'])
+        identity_cache.invalidate(row['user_id'])
+
+
+user_invalidations = InvalidationFeed('User', USER_INVALIDATION_QUERY, invalidate_users,
+                                      app.config['USER_INVALIDATION_POLL_INTERVAL'],
+                                      app.config['USER_INVALIDATION_OVERLAP'])
+
+
+def record_user_invalidation(cursor, user_id):
+    """Make every process drop its cached identity and tokens of a user (part of the caller's transaction)"""
+    cursor.execute('INSERT INTO user_invalidations (user_id) VALUES (%s)', (user_id,))
+    cursor.execute('DELETE FROM user_invalidations WHERE created_at < NOW() - INTERVAL 1 DAY')
+
+
 def require_auth(f):
     """Decorator to require authentication for routes"""
 
@@ -183,18 +1111,16 @@ def require_auth(f):
                 return jsonify({'error': 'Invalid authorization format'}), 401
 
             token = parts[1]
-            payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            payload = decode_token(token)
             user_id = payload['user_id']
 
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM users WHERE id = %s', (user_id,))
-            user = cursor.fetchone()
-            conn.close()
-
+            user = load_identity(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 401
 
+            # Handlers read the caller's identity from g instead of re-querying users
+            g.current_user = user
+
             return f(user_id, *args, **kwargs)
 
         except jwt.ExpiredSignatureError:
@@ -224,21 +1150,18 @@ def require_admin(f):
                 return jsonify({'error': 'Invalid authorization format'}), 401
 
             token = parts[1]
-            payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            payload = decode_token(token)
             user_id = payload['user_id']
 
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, user_type FROM users WHERE id = %s', (user_id,))
-            user = cursor.fetchone()
-            conn.close()
-
+            user = load_identity(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 401
 
             if user['user_type'] != 'admin':
                 return jsonify({'error': 'Admin access required'}), 403
 
+            g.current_user = user
+
             # Log admin access
             app.logger.info(f'ADMIN ACCESS: User ID {user_id} accessed admin API: {request.path}')
 
@@ -267,38 +1190,221 @@ def log_user_action(user_id, action, details=None):
         app.logger.info(f"USER ACTION: User {user_id} - {action}")
 
 
-def log_admin_activity(admin_id, action, details=None):
-    """Log admin activity in database"""
-    conn = get_db()
-    cursor = conn.cursor()
+class ActivityLogWriter:
+    """
+    Write-behind queue for admin_activity_log rows
+
+    Request threads enqueue rows; one background thread drains them in
+    multi-row INSERTs. When the queue is full, enqueue waits briefly
+    (backpressure) and then drops the row. stop() flushes what is left.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval=1.0, put_timeout=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # Started lazily so forked workers each get their own writer thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, row):
+        """Queue (admin_id, admin_name, action, details); returns False if the row was dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            app.logger.warning(f'Admin activity log queue full, dropped entry ({self.dropped} dropped so far)')
+            return False
+
+    def _take_batch(self, wait):
+        try:
+            batch = [self._queue.get(timeout=wait) if wait else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            # executemany folds this into a single multi-row INSERT
+            cursor.executemany('''
+                INSERT INTO admin_activity_log 
+                (admin_id, admin_name, action, details) 
+                VALUES (%s, %s, %s, %s)
+            ''', batch)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            app.logger.error(f'Error writing {len(batch)} admin activity entries: {str(e)}')
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set():
+                return
+
+    def reset(self):
+        """Drop the queue and thread state inherited from a parent process (after fork)"""
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self, timeout=10):
+        """Stop the writer and flush queued rows"""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        # Write anything the thread did not get to
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                return
+            self._write(batch)
+
+
+activity_log_writer = ActivityLogWriter(app.config['ACTIVITY_LOG_QUEUE_SIZE'],
+                                        app.config['ACTIVITY_LOG_BATCH_SIZE'],
+                                        app.config['ACTIVITY_LOG_FLUSH_INTERVAL'])
+atexit.register(activity_log_writer.stop)
 
+
+def log_admin_activity(admin_id, action, details=None):
+    """Log admin activity in database (written in the background)"""
     try:
-        # Get admin name
-        cursor.execute('SELECT full_name FROM users WHERE id = %s', (admin_id,))
-        admin = cursor.fetchone()
+        # Admin name comes from the identity resolved by require_admin
+        if has_request_context() and g.get('current_user') and g.current_user['id'] == admin_id:
+            admin = g.current_user
+        else:
+            admin = load_identity(admin_id)
         admin_name = admin['full_name'] if admin else 'Unknown Admin'
 
-        # Log the activity
-        cursor.execute('''
-            INSERT INTO admin_activity_log 
-            (admin_id, admin_name, action, details) 
-            VALUES (%s, %s, %s, %s)
-        ''', (admin_id, admin_name, action, details))
-
-        conn.commit()
+        activity_log_writer.enqueue((admin_id, admin_name, action, details))
         app.logger.info(f'ADMIN ACTION: {admin_name} ({admin_id}) {action} {details or ""}')
 
     except Exception as e:
-        conn.rollback()
         app.logger.error(f'Error logging admin activity: {str(e)}')
-    finally:
-        conn.close()
+
+
+def iter_lines_reverse(path, start=0, end=None, block_size=65536):
+    """Yield the lines of a file (or of its [start, end) byte range) from last to first, reading backward"""
+    with open(path, 'rb') as file:
+        if end is None:
+            file.seek(0, os.SEEK_END)
+            end = file.tell()
+        position = end
+        buffer = b''
+        ends_with_newline = None
+
+        while position > start:
+            read_size = min(block_size, position - start)
+            position -= read_size
+            file.seek(position)
+            chunk = file.read(read_size)
+
+            if ends_with_newline is None:
+                # Drop the file's trailing newline so it does not produce an empty last line
+                ends_with_newline = chunk.endswith(b'\n')
+                if ends_with_newline:
+                    chunk = chunk[:-1]
+                newline = b'\n' if ends_with_newline else b''
+
+            lines = (chunk + buffer).split(b'\n')
+            buffer = lines[0]  # May continue in the previous block
+            for line in reversed(lines[1:]):
+                yield (line + newline).decode('utf-8', errors='replace')
+                newline = b'\n'
+
+        if ends_with_newline is not None:
+            yield (buffer + newline).decode('utf-8', errors='replace')
+
+
+def log_file_paths():
+    """Current log file followed by its rotated backups, newest first"""
+    log_path = os.path.join('logs', app.config['LOG_FILENAME'])
+    paths = [log_path] + [f'{log_path}.{index}' for index in range(1, handler.backupCount + 1)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def date_to_timestamp(value, days=0):
+    """Local midnight of a YYYY-MM-DD date (plus days) as an epoch timestamp"""
+    return (datetime.strptime(value, '%Y-%m-%d') + timedelta(days=days)).timestamp()
+
+
+def log_read_plan(start_date=None, end_date=None):
+    """
+    Segments and byte ranges to scan for a date window, newest first
+
+    Returns [(path, [(start, end), ...])]. Without date bounds, or for segments
+    without an index, whole files are scanned.
+    """
+    start_ts = date_to_timestamp(start_date) if start_date else None
+    end_ts = date_to_timestamp(end_date, days=1) if end_date else None
+    plan = []
+
+    for path in log_file_paths():
+        blocks = handler.segment_index(path) if (start_ts or end_ts) else None
+        if not blocks:
+            plan.append((path, [(0, None)]))
+            continue
+
+        ranges = []
+        for block in blocks:
+            if block['first'] is not None:
+                if end_ts is not None and block['first'] >= end_ts:
+                    continue
+                if start_ts is not None and block['last'] < start_ts:
+                    continue
+            # Merge with the previous range when contiguous
+            if ranges and ranges[-1][1] == block['offset']:
+                ranges[-1] = (ranges[-1][0], block['end'])
+            else:
+                ranges.append((block['offset'], block['end']))
+
+        if ranges:
+            plan.append((path, ranges[::-1]))
+
+        # Older segments cannot reach into the window once this one starts before it
+        fully_indexed = all(block['first'] is not None for block in blocks)
+        if start_ts is not None and fully_indexed and min(block['first'] for block in blocks) < start_ts:
+            break
+
+    return plan
 
 
 def read_logs(tail_lines=100, filter_text=None, log_level=None, start_date=None, end_date=None):
     """
     Read logs with filtering options
 
+    Walks the current log and then its rotated backups backward from the end,
+    stopping as soon as tail_lines matching lines are found or the lines get
+    older than start_date. With a date window only the byte ranges the time
+    index places inside it are read.
+
     Args:
         tail_lines: Number of lines to return
         filter_text: Text to filter logs by
@@ -311,44 +1417,1271 @@ def read_logs(tail_lines=100, filter_text=None, log_level=None, start_date=None,
         if not os.path.exists(log_path):
             return ["Logs not found"]
 
-        with open(log_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
         # Apply filters
         filtered_lines = []
         date_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})')
+        timestamp_pattern = re.compile(r'^(?:\{"time": ")?(\d{4}-\d{2}-\d{2}) ')
+        filter_lower = filter_text.lower() if filter_text else None
+
+        for path, ranges in log_read_plan(start_date, end_date):
+            for start, end in ranges:
+                for line in iter_lines_reverse(path, start, end):
+                    # Everything further back is older than the requested range
+                    if start_date:
+                        timestamp_match = timestamp_pattern.match(line)
+                        if timestamp_match and timestamp_match.group(1) < start_date:
+                            return filtered_lines[::-1]
+
+                    # Text filter
+                    if filter_lower and filter_lower not in line.lower():
+                        continue
 
-        for line in lines:
-            # Text filter
-            if filter_text and filter_text.lower() not in line.lower():
-                continue
+                    # Log level filter
+                    if log_level:
+                        if log_level == "ERROR" and "ERROR" not in line:
+                            continue
+                        elif log_level == "WARNING" and "WARNING" not in line and "ERROR" not in line:
+                            continue
+                        elif log_level == "INFO" and "INFO" not in line and "WARNING" not in line and "ERROR" not in line:
+                            continue
+
+                    # Date filter
+                    if start_date or end_date:
+                        date_match = date_pattern.search(line)
+                        if date_match:
+                            line_date = date_match.group(1)
+                            if start_date and line_date < start_date:
+                                continue
+                            if end_date and line_date > end_date:
+                                continue
+
+                    filtered_lines.append(line)
+                    if len(filtered_lines) >= tail_lines:
+                        return filtered_lines[::-1]
+
+        # Return lines in chronological order
+        return filtered_lines[::-1]
 
-            # Log level filter
-            if log_level:
-                if log_level == "ERROR" and "ERROR" not in line:
-                    continue
-                elif log_level == "WARNING" and "WARNING" not in line and "ERROR" not in line:
-                    continue
-                elif log_level == "INFO" and "INFO" not in line and "WARNING" not in line and "ERROR" not in line:
-                    continue
+    except Exception as e:
+        return [f"Error reading logs: {str(e)}"]
 
-            # Date filter
-            if start_date or end_date:
-                date_match = date_pattern.search(line)
-                if date_match:
-                    line_date = date_match.group(1)
-                    if start_date and line_date < start_date:
-                        continue
-                    if end_date and line_date > end_date:
-                        continue
 
-            filtered_lines.append(line)
+# ============================================================
+# SCHEDULE READ MODEL
+# ============================================================
+
+# Marker for NULL in integer columns
+NULL_INT = -2147483648
+
+SCHEDULE_INT_COLUMNS = ('semester', 'week_number', 'course', 'subgroup', 'weekday')
+SCHEDULE_STR_COLUMNS = ('group_name', 'teacher_name', 'subject', 'lesson_type', 'faculty', 'auditory')
+
+# Raw schedule rows as loaded into the read model
+SCHEDULE_RAW_QUERY = '''
+    SELECT 
+        id, semester, week_number, group_name, course, faculty, subject,
+        lesson_type, subgroup, date, time_start, time_end, weekday,
+        teacher_name, auditory, updated_at
+    FROM schedule
+'''
+
+
+class StringPool:
+    """Interns repeated strings (groups, teachers, subjects...) as small integer ids"""
+
+    def __init__(self):
+        self.values = [None]  # Id 0 is NULL
+        self.ids = {}
+
+    def id_for(self, value):
+        if value is None:
+            return 0
+        sid = self.ids.get(value)
+        if sid is None:
+            value = sys.intern(value)
+            sid = len(self.values)
+            self.values.append(value)
+            self.ids[value] = sid
+        return sid
+
+    def lookup(self, value):
+        return self.ids.get(value)
+
+
+class ScheduleColumnStore:
+    """
+    Column arrays for schedule rows plus (group, date) and (teacher, date) indexes
+
+    Each lesson occupies one slot across all arrays. Strings are stored as
+    StringPool ids, dates as ordinals, times as minutes since midnight.
+    """
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.ids = array('i')
+        self.dates = array('i')
+        self.time_start = array('h')
+        self.time_end = array('h')
+        self.updated_at = array('d')
+        self.int_columns = {column: array('i') for column in SCHEDULE_INT_COLUMNS}
+        self.str_columns = {column: array('i') for column in SCHEDULE_STR_COLUMNS}
+
+        self.slots = {}  # schedule id -> slot
+        self.free_slots = []
+        self.by_group = {}  # group sid -> {date ordinal -> [slot]}
+        self.by_teacher = {}  # teacher sid -> {date ordinal -> [slot]}
+        self.teacher_groups = {}  # teacher sid -> {group sid -> lesson count}
+        self.watermark = None  # Latest updated_at seen
+        self.generation = time.time()  # Distinguishes stores across reloads in validators
+        self.version = 0  # Bumped on every change
+
+    def __len__(self):
+        return len(self.slots)
+
+    @staticmethod
+    def _minutes(value):
+        if value is None:
+            return -1
+        if isinstance(value, timedelta):
+            return int(value.total_seconds()) // 60
+        return value.hour * 60 + value.minute
+
+    @staticmethod
+    def _index_add(index, key, day, slot):
+        index.setdefault(key, {}).setdefault(day, []).append(slot)
+
+    @staticmethod
+    def _index_remove(index, key, day, slot):
+        days = index.get(key)
+        if days is None or day not in days:
+            return
+        days[day].remove(slot)
+        if not days[day]:
+            del days[day]
+        if not days:
+            del index[key]
+
+    def _link(self, slot):
+        day = self.dates[slot]
+        if day == NULL_INT:
+            return
+        group = self.str_columns['group_name'][slot]
+        teacher = self.str_columns['teacher_name'][slot]
+        if group:
+            self._index_add(self.by_group, group, day, slot)
+        if teacher:
+            self._index_add(self.by_teacher, teacher, day, slot)
+            if group:
+                counts = self.teacher_groups.setdefault(teacher, {})
+                counts[group] = counts.get(group, 0) + 1
+
+    def _unlink(self, slot):
+        day = self.dates[slot]
+        if day == NULL_INT:
+            return
+        group = self.str_columns['group_name'][slot]
+        teacher = self.str_columns['teacher_name'][slot]
+        if group:
+            self._index_remove(self.by_group, group, day, slot)
+        if teacher:
+            self._index_remove(self.by_teacher, teacher, day, slot)
+            counts = self.teacher_groups.get(teacher)
+            if group and counts and group in counts:
+                counts[group] -= 1
+                if not counts[group]:
+                    del counts[group]
+                if not counts:
+                    del self.teacher_groups[teacher]
+
+    def upsert(self, row):
+        """Insert or replace a raw schedule row"""
+        slot = self.slots.get(row['id'])
+        if slot is not None:
+            self._unlink(slot)
+        elif self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = len(self.ids)
+            self.ids.append(0)
+            self.dates.append(NULL_INT)
+            self.time_start.append(-1)
+            self.time_end.append(-1)
+            self.updated_at.append(0.0)
+            for values in self.int_columns.values():
+                values.append(NULL_INT)
+            for values in self.str_columns.values():
+                values.append(0)
+
+        self.slots[row['id']] = slot
+        self.ids[slot] = row['id']
+        self.dates[slot] = row['date'].toordinal() if row['date'] else NULL_INT
+        self.time_start[slot] = self._minutes(row['time_start'])
+        self.time_end[slot] = self._minutes(row['time_end'])
+        self.updated_at[slot] = row['updated_at'].timestamp() if row['updated_at'] else 0.0
+        for column, values in self.int_columns.items():
+            values[slot] = NULL_INT if row[column] is None else int(row[column])
+        for column, values in self.str_columns.items():
+            values[slot] = self.strings.id_for(row[column])
+
+        self._link(slot)
+        self.version += 1
+        if row['updated_at'] and (self.watermark is None or row['updated_at'] > self.watermark):
+            self.watermark = row['updated_at']
+
+    def remove(self, schedule_id):
+        slot = self.slots.pop(schedule_id, None)
+        if slot is None:
+            return
+        self._unlink(slot)
+        self.ids[slot] = 0
+        self.free_slots.append(slot)
+        self.version += 1
+
+    def window(self, column, value, date_from=None, date_to=None, semester=None):
+        """Slots for a group/teacher within a date range or semester, ordered by date and start time"""
+        index = self.by_group if column == 'group_name' else self.by_teacher
+        sid = self.strings.lookup(value)
+        days = index.get(sid) if sid is not None else None
+        if not days:
+            return []
+
+        slots = []
+        if semester is None:
+            first, last = date_from.toordinal(), date_to.toordinal()
+            if last - first + 1 < len(days):
+                for day in range(first, last + 1):
+                    slots.extend(days.get(day, ()))
+            else:
+                for day, day_slots in days.items():
+                    if first <= day <= last:
+                        slots.extend(day_slots)
+        else:
+            semesters = self.int_columns['semester']
+            for day_slots in days.values():
+                slots.extend(slot for slot in day_slots if semesters[slot] == semester)
+
+        slots.sort(key=lambda slot: (self.dates[slot], self.time_start[slot]))
+        return slots
+
+    def validator(self, slots):
+        """Count and latest updated_at of the given slots"""
+        return len(slots), max((self.updated_at[slot] for slot in slots), default=0.0)
+
+    def _row(self, slot):
+        def as_int(column):
+            value = self.int_columns[column][slot]
+            return None if value == NULL_INT else value
+
+        def as_str(column):
+            return self.strings.values[self.str_columns[column][slot]]
+
+        def as_time(minutes):
+            return None if minutes < 0 else f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+        day = self.dates[slot]
+        return {
+            'id': self.ids[slot],
+            'date': None if day == NULL_INT else datetime.fromordinal(day).strftime('%Y-%m-%d'),
+            'time_start': as_time(self.time_start[slot]),
+            'time_end': as_time(self.time_end[slot]),
+            'subject': as_str('subject'),
+            'lesson_type': as_str('lesson_type'),
+            'subgroup': as_int('subgroup'),
+            'group_name': as_str('group_name'),
+            'teacher_name': as_str('teacher_name'),
+            'auditory': as_str('auditory'),
+            'semester': as_int('semester'),
+            'week_number': as_int('week_number'),
+            'course': as_int('course'),
+            'faculty': as_str('faculty'),
+            'weekday': as_int('weekday')
+        }
+
+    def materialize(self, slots):
+        return [self._row(slot) for slot in slots]
+
+    def groups_of_teacher(self, teacher_name):
+        sid = self.strings.lookup(teacher_name)
+        counts = self.teacher_groups.get(sid, {}) if sid is not None else {}
+        return sorted(self.strings.values[group] for group in counts)
+
+    def memory_report(self):
+        """Approximate memory footprint in bytes, by component"""
+        def array_bytes(values):
+            return values.buffer_info()[1] * values.itemsize
+
+        def index_bytes(index):
+            total = sys.getsizeof(index)
+            for days in index.values():
+                total += sys.getsizeof(days)
+                total += sum(sys.getsizeof(day_slots) for day_slots in days.values())
+            return total
+
+        columns = [self.ids, self.dates, self.time_start, self.time_end, self.updated_at]
+        columns += list(self.int_columns.values()) + list(self.str_columns.values())
+
+        report = {
+            'columns': sum(array_bytes(values) for values in columns),
+            'strings': (sys.getsizeof(self.strings.values) + sys.getsizeof(self.strings.ids)
+                        + sum(sys.getsizeof(value) for value in self.strings.values[1:])),
+            'id_map': sys.getsizeof(self.slots),
+            'indexes': (index_bytes(self.by_group) + index_bytes(self.by_teacher)
+                        + sys.getsizeof(self.teacher_groups)
+                        + sum(sys.getsizeof(counts) for counts in self.teacher_groups.values()))
+        }
+        total = sum(report.values())
+        lessons = len(self)
+        return {
+            'lessons': lessons,
+            'distinct_strings': len(self.strings.values) - 1,
+            'bytes': report,
+            'total_bytes': total,
+            'bytes_per_100k_lessons': int(total * 100000 / lessons) if lessons else 0
+        }
+
+
+class ScheduleReadModel:
+    """
+    In-process read model of the schedule table
+
+    Loaded in full on first use, refreshed incrementally from updated_at and
+    reloaded periodically so deletes made by other processes are picked up.
+    Admin schedule writes are applied through immediately.
+    """
+
+    def __init__(self, refresh_interval=30, reload_interval=900):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self.store = None
+        self._last_refresh = 0.0
+        self._last_reload = 0.0
+
+    @property
+    def loaded(self):
+        return self.store is not None
+
+    def load(self):
+        """Build a fresh store from the whole table and swap it in"""
+        store = ScheduleColumnStore()
+        conn = get_db()
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(SCHEDULE_RAW_QUERY)
+            for row in cursor:
+                store.upsert(row)
+            cursor.close()
+        finally:
+            conn.close()
+
+        with self.lock:
+            self.store = store
+            self._last_refresh = self._last_reload = time.monotonic()
+        app.logger.info(f'Schedule read model loaded: {len(store)} lessons')
 
-        # Return only requested number of lines
-        return filtered_lines[-tail_lines:] if len(filtered_lines) > tail_lines else filtered_lines
+    def refresh(self):
+        """Apply rows changed since the watermark; reload if row counts drifted"""
+        with self.lock:
+            watermark = self.store.watermark
 
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            if watermark is None:
+                cursor.execute(SCHEDULE_RAW_QUERY)
+            else:
+                cursor.execute(SCHEDULE_RAW_QUERY + ' WHERE updated_at >= %s', (watermark,))
+            rows = cursor.fetchall()
+            cursor.execute('SELECT COUNT(*) as count FROM schedule')
+            total = cursor.fetchone()['count']
+        finally:
+            conn.close()
+
+        with self.lock:
+            for row in rows:
+                self.store.upsert(row)
+            self._last_refresh = time.monotonic()
+            drifted = len(self.store) != total
+
+        if drifted:
+            self.load()
+
+    def ensure_fresh(self):
+        """Load on first use and refresh in the background of one request thread when due"""
+        if not self.loaded:
+            with self._refresh_lock:
+                if not self.loaded:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_interval:
+            return
+        # Only one thread refreshes; the others keep serving the current data
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._last_reload >= self.reload_interval:
+                self.load()
+            else:
+                self.refresh()
+        except Exception as e:
+            app.logger.error(f'Schedule read model refresh error: {str(e)}')
+        finally:
+            self._refresh_lock.release()
+
+    def mark_stale(self):
+        """Make the next ensure_fresh refresh (after a write made by another process)"""
+        self._last_refresh = 0.0
+
+    def apply_ids(self, cursor, schedule_ids):
+        """Write-through for admin changes: reload the given rows using the caller's cursor"""
+        if not self.loaded or not schedule_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(schedule_ids))
+        cursor.execute(SCHEDULE_RAW_QUERY + f' WHERE id IN ({placeholders})', list(schedule_ids))
+        rows = cursor.fetchall()
+        with self.lock:
+            for row in rows:
+                self.store.upsert(row)
+
+    def remove_ids(self, schedule_ids):
+        if not self.loaded:
+            return
+        with self.lock:
+            for schedule_id in schedule_ids:
+                self.store.remove(schedule_id)
+
+
+schedule_read_model = ScheduleReadModel(app.config['SCHEDULE_READ_MODEL_REFRESH'],
+                                        app.config['SCHEDULE_READ_MODEL_RELOAD'])
+
+
+def use_schedule_read_model():
+    """Whether reads should be answered from schedule_read_model (falls back to the DB on errors)"""
+    if not app.config['SCHEDULE_READ_MODEL']:
+        return False
+    try:
+        schedule_read_model.ensure_fresh()
     except Exception as e:
-        return [f"Error reading logs: {str(e)}"]
+        app.logger.error(f'Schedule read model load error: {str(e)}')
+    return schedule_read_model.loaded
+
+
+# ============================================================
+# SCHEDULE DICTIONARIES
+# ============================================================
+
+# Dictionary name -> (table, schedule column)
+DICTIONARY_TABLES = {
+    'groups': ('schedule_groups', 'group_name'),
+    'teachers': ('schedule_teachers', 'teacher_name')
+}
+
+
+def rebuild_dictionaries(cursor):
+    """Recompute group/teacher dictionaries from the schedule table"""
+    for name, (table, column) in DICTIONARY_TABLES.items():
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(f'''
+            INSERT INTO {table} (name, lesson_count)
+            SELECT {column}, COUNT(*) FROM schedule
+            WHERE {column} IS NOT NULL AND {column} != ''
+            GROUP BY {column}
+        ''')
+        cursor.execute('UPDATE dictionary_versions SET version = version + 1 WHERE name = %s', (name,))
+
+
+def sync_dictionaries(cursor, old_row=None, new_row=None):
+    """
+    Keep group/teacher dictionaries in step with a schedule write
+
+    Pass old_row for deletes, new_row for inserts and both for updates. Runs in
+    the caller's transaction; the dictionary version is bumped only when a name
+    appears or disappears.
+    """
+    for name, (table, column) in DICTIONARY_TABLES.items():
+        old_value = old_row.get(column) if old_row else None
+        new_value = new_row.get(column) if new_row else None
+        if old_value == new_value:
+            continue
+
+        membership_changed = False
+        if new_value:
+            affected = cursor.execute(f'''
+                INSERT INTO {table} (name, lesson_count) VALUES (%s, 1)
+                ON DUPLICATE KEY UPDATE lesson_count = lesson_count + 1
+            ''', (new_value,))
+            membership_changed = affected == 1
+        if old_value:
+            cursor.execute(f'UPDATE {table} SET lesson_count = lesson_count - 1 WHERE name = %s', (old_value,))
+            if cursor.execute(f'DELETE FROM {table} WHERE name = %s AND lesson_count <= 0', (old_value,)):
+                membership_changed = True
+
+        if membership_changed:
+            cursor.execute('UPDATE dictionary_versions SET version = version + 1 WHERE name = %s', (name,))
+
+
+def rebuild_teacher_groups(cursor):
+    """Recompute the teacher <-> group adjacency from the schedule table"""
+    cursor.execute('DELETE FROM schedule_teacher_groups')
+    cursor.execute('''
+        INSERT INTO schedule_teacher_groups (teacher_name, group_name, lesson_count)
+        SELECT teacher_name, group_name, COUNT(*) FROM schedule
+        WHERE teacher_name IS NOT NULL AND teacher_name != ''
+        AND group_name IS NOT NULL AND group_name != ''
+        GROUP BY teacher_name, group_name
+        ON DUPLICATE KEY UPDATE lesson_count = lesson_count + VALUES(lesson_count)
+    ''')
+
+
+def sync_teacher_groups(cursor, old_row=None, new_row=None):
+    """Keep the teacher <-> group adjacency in step with a schedule write (see sync_dictionaries)"""
+    old_pair = (old_row.get('teacher_name'), old_row.get('group_name')) if old_row else (None, None)
+    new_pair = (new_row.get('teacher_name'), new_row.get('group_name')) if new_row else (None, None)
+    if old_pair == new_pair:
+        return
+
+    if all(new_pair):
+        cursor.execute('''
+            INSERT INTO schedule_teacher_groups (teacher_name, group_name, lesson_count) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE lesson_count = lesson_count + 1
+        ''', new_pair)
+    if all(old_pair):
+        cursor.execute('''
+            UPDATE schedule_teacher_groups SET lesson_count = lesson_count - 1
+            WHERE teacher_name = %s AND group_name = %s
+        ''', old_pair)
+        cursor.execute('''
+            DELETE FROM schedule_teacher_groups
+            WHERE teacher_name = %s AND group_name = %s AND lesson_count <= 0
+        ''', old_pair)
+
+
+class DictionaryCache:
+    """Group/teacher lists served from memory and revalidated against dictionary_versions"""
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}  # name -> (version, values, checked_at)
+
+    def get(self, name):
+        """Return (version, values) for a dictionary"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry and now - entry[2] < self.check_interval:
+            return entry[0], entry[1]
+
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT version FROM dictionary_versions WHERE name = %s', (name,))
+            row = cursor.fetchone()
+            version = row['version'] if row else 0
+
+            if entry and entry[0] == version:
+                values = entry[1]
+            else:
+                cursor.execute(f'SELECT name FROM {DICTIONARY_TABLES[name][0]} ORDER BY name')
+                values = [row['name'] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._entries[name] = (version, values, now)
+        return version, values
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dictionary_cache = DictionaryCache(app.config['DICTIONARY_CHECK_INTERVAL'])
+
+
+# ============================================================
+# SCHEDULE PROFILES
+# ============================================================
+
+def name_filter(column, names):
+    """SQL condition and params restricting column to names (no restriction for None)"""
+    if names is None:
+        return '', []
+    return f'AND {column} IN ({", ".join(["%s"] * len(names))})', list(names)
+
+
+def refresh_group_profiles(cursor, names=None):
+    """
+    Recompute profile rows of the given groups (all groups for None)
+
+    Faculty and course come from any of the group's lessons; the counters cover
+    the group's latest semester.
+    """
+    condition, params = name_filter('name', names)
+    cursor.execute(f"DELETE FROM schedule_profiles WHERE kind = 'group' {condition}", params)
+
+    condition, params = name_filter('group_name', names)
+    cursor.execute(f'''
+        INSERT INTO schedule_profiles
+            (kind, name, faculty, course, semester, total_subjects, total_days, total_groups, total_lessons)
+        SELECT 
+            'group', s.group_name, MAX(s.faculty), MAX(s.course), cur.semester,
+            COUNT(DISTINCT CASE WHEN s.semester = cur.semester THEN s.subject END),
+            COUNT(DISTINCT CASE WHEN s.semester = cur.semester THEN s.date END),
+            0,
+            COUNT(CASE WHEN s.semester = cur.semester THEN 1 END)
+        FROM schedule s
+        JOIN (
+            SELECT group_name, MAX(semester) as semester
+            FROM schedule
+            WHERE group_name IS NOT NULL AND group_name != '' {condition}
+            GROUP BY group_name
+        ) cur ON cur.group_name = s.group_name
+        GROUP BY s.group_name, cur.semester
+    ''', params)
+
+
+def refresh_teacher_profiles(cursor, names=None):
+    """
+    Recompute profile rows of the given teachers (all teachers for None)
+
+    The counters cover the latest semester of the whole schedule, which is
+    stored with each row so a semester change can be detected.
+    """
+    cursor.execute('SELECT MAX(semester) as semester FROM schedule')
+    semester = cursor.fetchone()['semester']
+
+    condition, params = name_filter('name', names)
+    cursor.execute(f"DELETE FROM schedule_profiles WHERE kind = 'teacher' {condition}", params)
+
+    condition, params = name_filter('teacher_name', names)
+    cursor.execute(f'''
+        INSERT INTO schedule_profiles
+            (kind, name, faculty, course, semester, total_subjects, total_days, total_groups, total_lessons)
+        SELECT 
+            'teacher', teacher_name, MAX(faculty), NULL, %s,
+            COUNT(DISTINCT CASE WHEN semester = %s THEN subject END),
+            0,
+            COUNT(DISTINCT CASE WHEN semester = %s THEN group_name END),
+            COUNT(CASE WHEN semester = %s THEN 1 END)
+        FROM schedule
+        WHERE teacher_name IS NOT NULL AND teacher_name != '' {condition}
+        GROUP BY teacher_name
+    ''', [semester] * 4 + params)
+
+
+def rebuild_profiles(cursor):
+    """Recompute all group/teacher profile rows from the schedule table"""
+    refresh_group_profiles(cursor)
+    refresh_teacher_profiles(cursor)
+
+
+def sync_profiles(cursor, old_row=None, new_row=None):
+    """
+    Refresh the profiles touched by a schedule write (same arguments as sync_dictionaries)
+
+    Runs after the write in the caller's transaction. When the write moves the
+    latest semester, every teacher profile is recomputed.
+    """
+    rows = [row for row in (old_row, new_row) if row]
+    groups = {row.get('group_name') for row in rows} - {None, ''}
+    teachers = {row.get('teacher_name') for row in rows} - {None, ''}
+
+    if groups:
+        refresh_group_profiles(cursor, groups)
+
+    cursor.execute('''
+        SELECT COUNT(*) as count FROM schedule_profiles
+        WHERE kind = 'teacher' AND NOT (semester <=> (SELECT MAX(semester) FROM schedule))
+    ''')
+    if cursor.fetchone()['count']:
+        refresh_teacher_profiles(cursor)
+    elif teachers:
+        refresh_teacher_profiles(cursor, teachers)
+
+
+# ============================================================
+# ANALYTICS ROLLUPS
+# ============================================================
+
+def rebuild_rollups(cursor):
+    """Recompute schedule/user rollups from the base tables"""
+    rebuild_schedule_rollup(cursor)
+
+    cursor.execute('DELETE FROM user_rollup')
+    cursor.execute('''
+        INSERT INTO user_rollup (month, user_type, user_count)
+        SELECT DATE_FORMAT(created_at, '%Y-%m') as month_key, user_type, COUNT(*)
+        FROM users
+        GROUP BY month_key, user_type
+        ON DUPLICATE KEY UPDATE user_count = user_count + VALUES(user_count)
+    ''')
+
+
+def rollup_schedule(cursor, schedule_id, delta):
+    """
+    Add delta to the rollup counters of one schedule row
+
+    Call with -1 before a row is updated or deleted and +1 after it is inserted
+    or updated, inside the caller's transaction.
+    """
+    selects = ' UNION ALL '.join(
+        SCHEDULE_ROLLUP_SELECT.format(dimension=dimension) + ' WHERE id = %s'
+        for dimension in ROLLUP_DIMENSIONS
+    )
+    cursor.execute(f'''
+        INSERT INTO schedule_rollup (semester, faculty, dimension, value, value_is_null, lesson_count)
+        SELECT semester_key, faculty_key, dimension, value_key, value_is_null, %s FROM ({selects}) AS lesson
+        ON DUPLICATE KEY UPDATE lesson_count = lesson_count + VALUES(lesson_count)
+    ''', [delta] + [schedule_id] * len(ROLLUP_DIMENSIONS))
+
+
+def rollup_user(cursor, user_id, delta):
+    """Add delta to the registration counter of one user (same calling rules as rollup_schedule)"""
+    cursor.execute('''
+        INSERT INTO user_rollup (month, user_type, user_count)
+        SELECT DATE_FORMAT(created_at, '%%Y-%%m'), user_type, %s FROM users WHERE id = %s
+        ON DUPLICATE KEY UPDATE user_count = user_count + VALUES(user_count)
+    ''', (delta, user_id))
+
+
+def rollup_filter():
+    """WHERE conditions and params for the semester/faculty query arguments"""
+    conditions = []
+    params = []
+
+    semester = request.args.get('semester', type=int)
+    if semester is not None:
+        conditions.append('semester = %s')
+        params.append(semester)
+
+    faculty = request.args.get('faculty')
+    if faculty is not None:
+        conditions.append('faculty = %s')
+        params.append(faculty)
+
+    return conditions, params
+
+
+# ============================================================
+# SCHEDULE IMPORT
+# ============================================================
+
+# Fields a schedule item cannot be created without
+SCHEDULE_REQUIRED_FIELDS = ['date', 'time_start', 'time_end', 'subject',
+                            'lesson_type', 'group_name', 'teacher_name', 'auditory']
+
+SCHEDULE_IMPORT_COLUMNS = ('id', 'date', 'time_start', 'time_end', 'subject', 'lesson_type',
+                           'group_name', 'teacher_name', 'auditory', 'subgroup',
+                           'semester', 'week_number', 'course', 'faculty', 'weekday')
+
+SCHEDULE_IMPORT_INT_COLUMNS = ('id', 'subgroup', 'semester', 'week_number', 'course', 'weekday')
+
+# Rows with an existing id are updated in place, the rest are inserted
+SCHEDULE_UPSERT_QUERY = '''
+    INSERT INTO schedule ({columns})
+    VALUES ({placeholders})
+    ON DUPLICATE KEY UPDATE {updates}
+'''.format(
+    columns=', '.join(SCHEDULE_IMPORT_COLUMNS),
+    placeholders=', '.join(['%s'] * len(SCHEDULE_IMPORT_COLUMNS)),
+    updates=', '.join(f'{column} = VALUES({column})' for column in SCHEDULE_IMPORT_COLUMNS[1:])
+)
+
+
+def iter_import_records(stream, import_format):
+    """
+    Lazily parse an upload into (line_number, record, parse_error) tuples
+
+    import_format is 'csv' (header row with API field names) or 'ndjson'.
+    Undecodable bytes and malformed CSV are reported for the affected row and
+    parsing carries on, so a bad line cannot abort an import half way.
+    """
+    # Invalid UTF-8 decodes to U+FFFD, which marks the row as failed below
+    reader = codecs.getreader('utf-8-sig')(stream, errors='replace')
+
+    if import_format == 'ndjson':
+        for line_number, line in enumerate(reader, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if '\ufffd' in line:
+                yield line_number, None, 'Invalid UTF-8'
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {str(e)}'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'Expected a JSON object'
+                continue
+            yield line_number, record, None
+        return
+
+    csv_reader = csv.DictReader(reader)
+    while True:
+        try:
+            record = next(csv_reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # The reader resumes at the next line
+            yield csv_reader.line_num, None, f'Invalid CSV: {str(e)}'
+            continue
+
+        # Line number of the record's last physical line (header is line 1)
+        if any('\ufffd' in value for value in record.values() if isinstance(value, str)):
+            yield csv_reader.line_num, None, 'Invalid UTF-8'
+            continue
+        yield csv_reader.line_num, record, None
+
+
+def normalize_import_record(record):
+    """Validate a record like admin_create_schedule does; returns (params, errors)"""
+    errors = []
+    values = {}
+
+    for field in SCHEDULE_REQUIRED_FIELDS:
+        if not record.get(field):
+            errors.append(f'Field {field} is required')
+
+    for column in SCHEDULE_IMPORT_COLUMNS:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        values[column] = value if value not in ('', None) else None
+
+    for column in SCHEDULE_IMPORT_INT_COLUMNS:
+        if values[column] is not None:
+            try:
+                values[column] = int(values[column])
+            except (TypeError, ValueError):
+                errors.append(f'Field {column} must be an integer')
+
+    if values['date']:
+        try:
+            lesson_date = datetime.strptime(str(values['date']), '%Y-%m-%d').date()
+            if values['weekday'] is None:
+                values['weekday'] = lesson_date.isoweekday()
+        except ValueError:
+            errors.append('Field date must be YYYY-MM-DD')
+
+    for column in ('time_start', 'time_end'):
+        if values[column] and not re.match(r'^\d{1,2}:\d{2}(:\d{2})?$', str(values[column])):
+            errors.append(f'Field {column} must be HH:MM')
+
+    if values['subgroup'] is None:
+        values['subgroup'] = 0
+
+    return tuple(values[column] for column in SCHEDULE_IMPORT_COLUMNS), errors
+
+
+def upsert_schedule_chunk(conn, cursor, chunk):
+    """
+    Upsert a chunk of (line_number, params) in one transaction
+
+    If the multi-row statement fails, the chunk is retried row by row so the
+    failure can be attributed. Returns (imported_count, [(line_number, error)]).
+    """
+    try:
+        record_moved_lessons(cursor, [params for _, params in chunk])
+        cursor.executemany(SCHEDULE_UPSERT_QUERY, [params for _, params in chunk])
+        conn.commit()
+        return len(chunk), []
+    except pymysql.MySQLError:
+        conn.rollback()
+
+    imported = 0
+    failures = []
+    for line_number, params in chunk:
+        try:
+            record_moved_lessons(cursor, [params])
+            cursor.execute(SCHEDULE_UPSERT_QUERY, params)
+            conn.commit()
+            imported += 1
+        except pymysql.MySQLError as e:
+            conn.rollback()
+            failures.append((line_number, str(e)))
+    return imported, failures
+
+
+def refresh_after_import(conn, cursor):
+    """Rebuild derived tables and drop caches once after an import committed rows"""
+    rebuild_dictionaries(cursor)
+    rebuild_teacher_groups(cursor)
+    rebuild_profiles(cursor)
+    rebuild_rollups(cursor)
+    record_schedule_invalidation(cursor)
+    conn.commit()
+    dictionary_cache.invalidate()
+    stats_cache.invalidate('dashboard')
+    schedule_response_cache.clear()
+
+    # The rows are committed; a stale read model catches up on its next periodic refresh
+    if schedule_read_model.loaded:
+        try:
+            schedule_read_model.refresh()
+        except Exception as e:
+            app.logger.warning(f'Schedule read model refresh after import error: {str(e)}')
+
+
+# ============================================================
+# SNAPSHOT CACHE
+# ============================================================
+
+class SnapshotCache:
+    """
+    Keyed values recomputed at most once per TTL
+
+    Concurrent misses are single-flighted: one thread computes while the others
+    serve the previous (stale) value, or wait for the result when there is none.
+    invalidate() only marks entries stale, so readers never hit a cold cache
+    after a write.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, value)
+        self._inflight = {}  # key -> threading.Event
+
+    def get(self, key, compute):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+                event = self._inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[key] = threading.Event()
+
+            if leader:
+                try:
+                    value = compute()
+                    with self._lock:
+                        self._entries[key] = (time.monotonic() + self.ttl, value)
+                    return value
+                finally:
+                    with self._lock:
+                        del self._inflight[key]
+                    event.set()
+
+            if entry:
+                return entry[1]
+            # Nothing to serve yet; wait for the leader (and retry if it failed)
+            event.wait()
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys or list(self._entries):
+                if key in self._entries:
+                    self._entries[key] = (0, self._entries[key][1])
+
+
+stats_cache = SnapshotCache(app.config['DASHBOARD_STATS_TTL'])
+
+
+# ============================================================
+# SCHEDULE RESPONSE CACHE
+# ============================================================
+
+class ScheduleResponseCache:
+    """
+    Encoded get_schedule day lists keyed by (filter column, filter value, date)
+
+    Every student of a group gets the same bytes for a day, so a day is encoded
+    once and reused until a schedule write touching its group/teacher and date
+    invalidates it. Writes handled by other worker processes arrive through
+    schedule_invalidations. Memory is bounded by total body bytes with LRU
+    eviction; entries also expire after ttl seconds as a backstop.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=30, max_days=31):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (column, value, day) -> (expires_at, body, etag, lesson_count)
+        self._bytes = 0
+        self.generation = 0  # Bumped by every invalidation; loads that straddle one are not stored
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def cacheable(self, filter_value, mode, date_from, date_to):
+        return (self.max_bytes > 0 and bool(filter_value) and mode != 'semester'
+                and (date_to - date_from).days < self.max_days)
+
+    def get_days(self, column, value, days):
+        """[(body, etag, lesson_count)] for the days, or None unless all of them are cached"""
+        now = time.monotonic()
+        with self._lock:
+            entries = []
+            for day in days:
+                key = (column, value, day)
+                entry = self._entries.get(key)
+                if entry is None or entry[0] <= now:
+                    if entry is not None:
+                        self._remove(key)
+                    self._stats['misses'] += 1
+                    return None
+                entries.append(entry[1:])
+            for day in days:
+                self._entries.move_to_end((column, value, day))
+            self._stats['hits'] += 1
+            return entries
+
+    def put_days(self, column, value, days, grouped, generation):
+        """Encode each day's lessons; store them unless an invalidation happened since generation"""
+        entries = []
+        for day in days:
+            lessons = grouped.get(day, [])
+            body = app.json.dumps(lessons).encode('utf-8')
+            entries.append((body, hashlib.sha1(body).hexdigest(), len(lessons)))
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation == self.generation:
+                for day, entry in zip(days, entries):
+                    self._store((column, value, day), (expires_at,) + entry)
+        return entries
+
+    def invalidate_rows(self, *rows):
+        """Drop the days of the groups/teachers of schedule rows (pass old and new rows of an update)"""
+        self.invalidate_keys(schedule_cache_keys(*rows))
+
+    def invalidate_keys(self, keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, entry):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += len(entry[1])
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry[1])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes})
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+schedule_response_cache = ScheduleResponseCache(app.config['SCHEDULE_RESPONSE_CACHE_BYTES'],
+                                                app.config['SCHEDULE_RESPONSE_CACHE_TTL'],
+                                                app.config['SCHEDULE_RESPONSE_CACHE_MAX_DAYS'])
+
+
+def schedule_cache_keys(*rows):
+    """(column, value, day) cache keys of the groups/teachers and dates of schedule rows"""
+    keys = set()
+    for row in rows:
+        if not row or not row.get('date'):
+            continue
+        day = str(row['date'])[:10]
+        for column in ('group_name', 'teacher_name'):
+            if row.get(column):
+                keys.add((column, row[column], day))
+    return keys
+
+
+# filter_column NULL marks a change to every day (imports)
+SCHEDULE_INVALIDATION_QUERY = '''
+    SELECT id, filter_column, filter_value, DATE_FORMAT(day, '%%Y-%%m-%%d') as day, created_at
+    FROM schedule_invalidations WHERE created_at >= %s ORDER BY id
+'''
+
+
+def record_schedule_invalidation(cursor, keys=None):
+    """Make every process drop the cached days of keys, or all of them (part of the caller's transaction)"""
+    if keys is None:
+        cursor.execute('INSERT INTO schedule_invalidations (filter_column) VALUES (NULL)')
+    elif keys:
+        cursor.executemany('INSERT INTO schedule_invalidations (filter_column, filter_value, day) VALUES (%s, %s, %s)',
+                           sorted(keys))
+    cursor.execute('DELETE FROM schedule_invalidations WHERE created_at < NOW() - INTERVAL 1 DAY')
+
+
+def invalidate_schedule_days(rows):
+    """InvalidationFeed handler for schedule_invalidations rows"""
+    if any(row['filter_column'] is None for row in rows):
+        schedule_response_cache.clear()
+    else:
+        schedule_response_cache.invalidate_keys({(row['filter_column'], row['filter_value'], row['day'])
+                                                 for row in rows})
+    # The day lists are reloaded from the read model, so let it catch up with the write first
+    schedule_read_model.mark_stale()
+
+
+schedule_invalidations = InvalidationFeed('Schedule', SCHEDULE_INVALIDATION_QUERY, invalidate_schedule_days,
+                                          app.config['SCHEDULE_INVALIDATION_POLL_INTERVAL'],
+                                          app.config['SCHEDULE_INVALIDATION_OVERLAP'])
+
+
+def schedule_days(date_from, date_to):
+    """YYYY-MM-DD strings of every day in an inclusive window"""
+    return [(date_from + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((date_to - date_from).days + 1)]
+
+
+def compose_schedule_body(mode, days, entries):
+    """
+    get_schedule response bytes from cached day lists
+
+    A single day is sent as its list; a range as an object keyed by date,
+    which is what the JSON provider emits for group_lessons_by_date (sorted
+    keys, compact separators).
+    """
+    if mode == 'day':
+        return entries[0][0] + b'\n'
+    return b'{' + b','.join(b'"%s":%s' % (day.encode('ascii'), entry[0]) for day, entry in zip(days, entries)) + b'}\n'
+
+
+# ============================================================
+# CONDITIONAL RESPONSE HELPERS
+# ============================================================
+
+def make_etag(*parts):
+    """Build a strong validator from the parts that determine a response body"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+# Validator of a schedule window (append the WHERE clause)
+SCHEDULE_VALIDATOR_QUERY = '''
+    SELECT COUNT(*) as count, MAX(updated_at) as last_updated
+    FROM schedule
+'''
+
+
+def schedule_etag(cursor, where_clause='', params=(), *scope):
+    """
+    Strong ETag derived from COUNT(*) and MAX(updated_at) of the matching schedule rows
+
+    scope holds anything else that shapes the response (route, query string, filter value).
+    """
+    cursor.execute(SCHEDULE_VALIDATOR_QUERY + where_clause, params)
+    validator = cursor.fetchone()
+    return make_etag(*scope, validator['count'], validator['last_updated'])
+
+
+def query_key(path, args):
+    """Canonical form of a path and its (multi-valued) query arguments for use in validators"""
+    return path + '?' + '&'.join(f'{k}={v}' for k, v in sorted(args))
+
+
+def request_query_key():
+    """Canonical form of the request path and query string for use in validators"""
+    return query_key(request.path, request.args.items(multi=True))
+
+
+def is_not_modified(etag):
+    """Check whether the client's If-None-Match already holds this ETag"""
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    """Empty 304 response carrying the current ETag"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def etag_response(payload, etag, private=True):
+    """JSON response tagged with an ETag that clients must revalidate before reuse"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
+
+
+def encoded_etag_response(body, etag, private=True):
+    """etag_response for a body that is already encoded JSON"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
+
+
+# ============================================================
+# PAGINATION HELPERS
+# ============================================================
+
+def encode_cursor(*values):
+    """Opaque page token holding the sort key and id of the last row"""
+    raw = json.dumps([value if isinstance(value, (int, float)) or value is None else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a page token into its key values; raises ValueError when malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def paginated_response(payload, next_cursor):
+    """JSON response carrying the next page token in X-Next-Cursor"""
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+# ============================================================
+# SEARCH HELPERS
+# ============================================================
+
+
+# Shortest term the ngram FULLTEXT parser can match (server ngram_token_size)
+SEARCH_NGRAM_SIZE = 2
+
+
+def build_search_filter(columns, search):
+    """
+    Build a search condition over columns
+
+    Returns (condition, params, rank_expression). Terms are matched as
+    substrings through the FULLTEXT ngram index; a query containing a term
+    shorter than the ngram size falls back to LIKE and has no rank expression.
+    """
+    terms = [term.replace('"', '') for term in search.split()]
+    terms = [term for term in terms if term]
+
+    if terms and all(len(term) >= SEARCH_NGRAM_SIZE for term in terms):
+        # Every term must occur, each as an ngram phrase (substring match)
+        match = f'MATCH({", ".join(columns)}) AGAINST (%s IN BOOLEAN MODE)'
+        return match, [' '.join(f'+"{term}"' for term in terms)], match
+
+    search_param = f'%{search}%'
+    condition = '(' + ' OR '.join(f'{column} LIKE %s' for column in columns) + ')'
+    return condition, [search_param] * len(columns), None
 
 
 # ============================================================
@@ -374,7 +2707,7 @@ def register():
             return jsonify({'error': 'Email already exists'}), 400
 
         # Hash password
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = password_hasher.hash(data['password'])
 
         # Insert user
         cursor.execute('''
@@ -388,9 +2721,11 @@ def register():
             data.get('group'),
             data.get('teacher')
         ))
+        user_id = cursor.lastrowid
+        rollup_user(cursor, user_id, 1)
 
         conn.commit()
-        user_id = cursor.lastrowid
+        stats_cache.invalidate('dashboard')
 
         token = generate_token(user_id)
 
@@ -408,6 +2743,10 @@ def register():
             }
         })
 
+    except PasswordHasherBusyError as e:
+        app.logger.warning(f'Registration deferred: {str(e)}')
+        return jsonify({'error': 'Server is busy, please try again'}), 503
+
     except Exception as e:
         conn.rollback()
         app.logger.error(f'Registration error: {str(e)}')
@@ -433,11 +2772,24 @@ def login():
         ''', (data['email'],))
 
         user = cursor.fetchone()
-        if not user or not check_password_hash(user['password'], data['password']):
+        if not user or not password_hasher.check(user['password'], data['password']):
             app.logger.warning(
                 f'FAILED LOGIN: {data.get("email", "unknown")} - Invalid credentials - IP: {request.remote_addr}')
             return jsonify({'error': 'Invalid email or password'}), 401
 
+        # Upgrade hashes made with outdated parameters while the plain password is at hand;
+        # best effort, the user is authenticated either way and the next login retries
+        try:
+            if password_hasher.needs_rehash(user['password']):
+                cursor.execute('UPDATE users SET password = %s WHERE id = %s',
+                               (password_hasher.hash(data['password']), user['id']))
+                conn.commit()
+                password_hasher.record_rehash()
+                app.logger.info(f'PASSWORD REHASHED: User ID {user["id"]}')
+        except Exception as e:
+            conn.rollback()
+            app.logger.warning(f'Password rehash skipped for user {user["id"]}: {str(e)}')
+
         token = generate_token(user['id'])
 
         # Enhanced logging for successful login
@@ -456,114 +2808,330 @@ def login():
             }
         })
 
+    except PasswordHasherBusyError as e:
+        app.logger.warning(f'Login deferred for {data.get("email", "unknown")}: {str(e)} - IP: {request.remote_addr}')
+        return jsonify({'error': 'Server is busy, please try again'}), 503
+
+    except Exception as e:
+        app.logger.error(f'Login error for {data.get("email", "unknown")}: {str(e)} - IP: {request.remote_addr}')
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        conn.close()
+
+
+# ============================================================
+# SCHEDULE ROUTES
+# ============================================================
+
+# Longest date range a single schedule request may cover
+MAX_SCHEDULE_RANGE_DAYS = 366
+
+
+def parse_schedule_range(args):
+    """
+    Resolve schedule request parameters into a query window
+
+    Supported selectors (first match wins):
+        date=YYYY-MM-DD               single day, returns a flat list
+        from=YYYY-MM-DD&to=YYYY-MM-DD inclusive range, returns lessons grouped by date
+        week=YYYY-MM-DD               Monday-Sunday week containing the date, grouped by date
+        semester=N                    whole semester, grouped by date
+
+    Returns (mode, date_from, date_to, semester) or raises ValueError
+    """
+    if args.get('date'):
+        day = datetime.strptime(args['date'], '%Y-%m-%d').date()
+        return 'day', day, day, None
+
+    if args.get('from') or args.get('to'):
+        if not (args.get('from') and args.get('to')):
+            raise ValueError('Both from and to are required')
+        date_from = datetime.strptime(args['from'], '%Y-%m-%d').date()
+        date_to = datetime.strptime(args['to'], '%Y-%m-%d').date()
+        if date_to < date_from:
+            raise ValueError('to must not be earlier than from')
+        if (date_to - date_from).days >= MAX_SCHEDULE_RANGE_DAYS:
+            raise ValueError(f'Date range must not exceed {MAX_SCHEDULE_RANGE_DAYS} days')
+        return 'range', date_from, date_to, None
+
+    if args.get('week'):
+        day = datetime.strptime(args['week'], '%Y-%m-%d').date()
+        date_from = day - timedelta(days=day.weekday())
+        return 'range', date_from, date_from + timedelta(days=6), None
+
+    if args.get('semester'):
+        return 'semester', None, None, int(args['semester'])
+
+    raise ValueError('Date is required')
+
+
+def group_lessons_by_date(lessons, date_from=None, date_to=None):
+    """Group lessons by date, including empty days when the range is known"""
+    grouped = {}
+    if date_from and date_to:
+        day = date_from
+        while day <= date_to:
+            grouped[day.strftime('%Y-%m-%d')] = []
+            day += timedelta(days=1)
+
+    for lesson in lessons:
+        grouped.setdefault(lesson['date'], []).append(lesson)
+
+    return grouped
+
+
+def schedule_filter(user):
+    """(column, value) selecting a user's lessons: students by group, everyone else by teacher name"""
+    if user['user_type'] == 'student':
+        return 'group_name', user['group_name']
+    if user['user_type'] == 'teacher':
+        return 'teacher_name', user['teacher_name']
+    return 'teacher_name', None
+
+
+def schedule_window_clause(filter_column, filter_value, mode, date_from, date_to, semester):
+    """WHERE clause and params of a schedule window from parse_schedule_range"""
+    if mode == 'semester':
+        return f'WHERE {filter_column} = %s AND semester = %s', (filter_value, semester)
+    return f'WHERE {filter_column} = %s AND date BETWEEN %s AND %s', (filter_value, date_from, date_to)
+
+
+def schedule_period_label(mode, date_from, date_to, semester):
+    """Requested period in a readable form for the logs"""
+    if mode == 'semester':
+        return f'semester {semester}'
+    if date_from == date_to:
+        return date_from.strftime('%d.%m.%Y')
+    return f"{date_from.strftime('%d.%m.%Y')} - {date_to.strftime('%d.%m.%Y')}"
+
+
+def schedule_payload(mode, schedule, date_from, date_to):
+    """Response body for a window: a flat list for one day, otherwise lessons grouped by date"""
+    if mode == 'day':
+        return schedule
+    if mode == 'range':
+        return group_lessons_by_date(schedule, date_from, date_to)
+    return group_lessons_by_date(schedule)
+
+
+def fetch_schedule_window(filter_column, filter_value, date_from, date_to):
+    """Lessons of a date window from the read model or the database"""
+    if use_schedule_read_model():
+        with schedule_read_model.lock:
+            store = schedule_read_model.store
+            return store.materialize(store.window(filter_column, filter_value, date_from, date_to))
+
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        where_clause, params = schedule_window_clause(filter_column, filter_value, 'range', date_from, date_to, None)
+        cursor.execute(SCHEDULE_LESSON_QUERY + where_clause + ' ORDER BY date, time_start', params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+# Format of the since cursor handed out and accepted by /api/schedule/changes
+SYNC_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+SCHEDULE_SYNC_STATE_QUERY = 'SELECT NOW() as server_time'
+
+SCHEDULE_TOMBSTONE_INSERT = '''
+    INSERT INTO schedule_tombstones (schedule_id, group_name, teacher_name) VALUES (%s, %s, %s)
+'''
+
+
+def record_tombstone(cursor, schedule_id, group_name=None, teacher_name=None):
+    """Tell delta-sync clients of a group/teacher that a lesson is no longer theirs"""
+    cursor.execute(SCHEDULE_TOMBSTONE_INSERT, (schedule_id, group_name, teacher_name))
+
+
+def record_moved_lessons(cursor, rows):
+    """Tombstone the old group/teacher of import rows that move an existing lesson"""
+    id_index, group_index, teacher_index = (SCHEDULE_IMPORT_COLUMNS.index(column)
+                                            for column in ('id', 'group_name', 'teacher_name'))
+    incoming = {params[id_index]: params for params in rows if params[id_index] is not None}
+    if not incoming:
+        return
+
+    placeholders = ', '.join(['%s'] * len(incoming))
+    cursor.execute(f'SELECT id, group_name, teacher_name FROM schedule WHERE id IN ({placeholders})', list(incoming))
+    tombstones = []
+    for current in cursor.fetchall():
+        params = incoming[current['id']]
+        moved_from = (current['group_name'] if params[group_index] != current['group_name'] else None,
+                      current['teacher_name'] if params[teacher_index] != current['teacher_name'] else None)
+        if any(moved_from):
+            tombstones.append((current['id'],) + moved_from)
+    if tombstones:
+        cursor.executemany(SCHEDULE_TOMBSTONE_INSERT, tombstones)
+
+
+def purge_tombstones(cursor):
+    cursor.execute('DELETE FROM schedule_tombstones WHERE deleted_at < NOW() - INTERVAL %s DAY',
+                   (app.config['SCHEDULE_TOMBSTONE_RETENTION_DAYS'],))
+
+
+def parse_since(value):
+    """since parameter of /api/schedule/changes, or raises ValueError"""
+    if not value:
+        raise ValueError('since is required')
+    try:
+        return datetime.strptime(value.replace(' ', 'T'), SYNC_TIME_FORMAT)
+    except ValueError:
+        raise ValueError('since must be YYYY-MM-DDTHH:MM:SS')
+
+
+def schedule_changes_queries(filter_column):
+    """(changed lessons, deleted ids) queries for a filter column, both taking (filter value, since)"""
+    return (SCHEDULE_LESSON_QUERY + f'WHERE {filter_column} = %s AND updated_at >= %s ORDER BY date, time_start',
+            f'SELECT DISTINCT schedule_id FROM schedule_tombstones WHERE {filter_column} = %s AND deleted_at >= %s')
+
+
+def schedule_sync_reset(state, since):
+    """Whether a client must refetch in full: tombstones it has not seen may have been purged"""
+    horizon = state['server_time'] - timedelta(days=app.config['SCHEDULE_TOMBSTONE_RETENTION_DAYS'])
+    return since < horizon
+
+
+def schedule_changes_payload(state, since, changed, deleted):
+    """
+    Response body of /api/schedule/changes
+
+    The returned since trails the server clock by SCHEDULE_CHANGES_OVERLAP:
+    updated_at is set when a statement runs but the row is only visible on
+    commit, so the last few seconds are sent again on the next sync. Lessons
+    moved away and back again are reported as changed, not deleted.
+    """
+    next_since = max(since, state['server_time'] - timedelta(seconds=app.config['SCHEDULE_CHANGES_OVERLAP']))
+    changed_ids = {lesson['id'] for lesson in changed}
+    return {
+        'changed': changed,
+        'deleted': [schedule_id for schedule_id in deleted if schedule_id not in changed_ids],
+        'reset': schedule_sync_reset(state, since),
+        'since': next_since.strftime(SYNC_TIME_FORMAT)
+    }
+
+
+@app.route('/api/schedule', methods=['GET'])
+@require_auth
+def get_schedule(user_id):
+    """Get schedule for a date, a date range, a week or a semester"""
+    try:
+        try:
+            mode, date_from, date_to, semester = parse_schedule_range(request.args)
+        except ValueError as e:
+            app.logger.warning(f'SCHEDULE REQUEST ERROR: User {user_id} - {str(e)}')
+            return jsonify({'error': str(e)}), 400
+
+        # User type, name and filter data come from the identity loaded by require_auth
+        user = g.current_user
+        filter_column, filter_value = schedule_filter(user)
+        display_period = schedule_period_label(mode, date_from, date_to, semester)
+
+        # Enhanced logging with name
+        user_type_ru = "преподаватель" if user['user_type'] == 'teacher' else "студент"
+        app.logger.info(
+            f'SCHEDULE REQUESTED: {user["full_name"]} ({user_type_ru}) requested schedule for {display_period}')
+
+        # Day lists encoded once and shared by everyone with the same group/teacher
+        if schedule_response_cache.cacheable(filter_value, mode, date_from, date_to):
+            schedule_invalidations.refresh()
+            days = schedule_days(date_from, date_to)
+            entries = schedule_response_cache.get_days(filter_column, filter_value, days)
+            if entries is None:
+                generation = schedule_response_cache.generation
+                lessons = fetch_schedule_window(filter_column, filter_value, date_from, date_to)
+                entries = schedule_response_cache.put_days(filter_column, filter_value, days,
+                                                           group_lessons_by_date(lessons), generation)
+
+            etag = make_etag(request_query_key(), filter_column, filter_value, *(entry[1] for entry in entries))
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+
+            app.logger.info(f'SCHEDULE DATA: {user["full_name"]} received {sum(entry[2] for entry in entries)} '
+                            f'classes for {display_period}')
+            return encoded_etag_response(compose_schedule_body(mode, days, entries), etag)
+
+        if use_schedule_read_model():
+            with schedule_read_model.lock:
+                store = schedule_read_model.store
+                if mode == 'semester':
+                    slots = store.window(filter_column, filter_value, semester=semester)
+                else:
+                    slots = store.window(filter_column, filter_value, date_from, date_to)
+
+                etag = make_etag(request_query_key(), filter_column, filter_value, *store.validator(slots))
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+
+                schedule = store.materialize(slots)
+        else:
+            conn = get_db()
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+
+            where_clause, params = schedule_window_clause(filter_column, filter_value, mode, date_from, date_to, semester)
+
+            # Answer revalidations without materializing or encoding any rows
+            etag = schedule_etag(cursor, where_clause, params, request_query_key(), filter_column, filter_value)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+
+            # One query for the whole window, served by the (filter_column, date) lookup
+            cursor.execute(SCHEDULE_LESSON_QUERY + where_clause + ' ORDER BY date, time_start', params)
+
+            schedule = cursor.fetchall()
+
+        # Additional log about number of classes in schedule
+        app.logger.info(f'SCHEDULE DATA: {user["full_name"]} received {len(schedule)} classes for {display_period}')
+
+        return etag_response(schedule_payload(mode, schedule, date_from, date_to), etag)
+
     except Exception as e:
-        app.logger.error(f'Login error for {data.get("email", "unknown")}: {str(e)} - IP: {request.remote_addr}')
+        app.logger.error(f'Error getting schedule for user {user_id}: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
     finally:
-        conn.close()
-
+        if 'conn' in locals():
+            conn.close()
 
-# ============================================================
-# SCHEDULE ROUTES
-# ============================================================
 
-@app.route('/api/schedule', methods=['GET'])
+@app.route('/api/schedule/changes', methods=['GET'])
 @require_auth
-def get_schedule(user_id):
-    """Get schedule for a specific date"""
-    try:
-        date = request.args.get('date')
-        if not date:
-            app.logger.warning(f'SCHEDULE REQUEST ERROR: User {user_id} - Date not specified')
-            return jsonify({'error': 'Date is required'}), 400
-
-        conn = get_db()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-        # Get user type, name and filter data
-        cursor.execute('''
-            SELECT 
-                user_type, 
-                full_name,
-                CASE 
-                    WHEN user_type = 'student' THEN group_name 
-                    WHEN user_type = 'teacher' THEN teacher_name 
-                END as filter_value
-            FROM users 
-            WHERE id = %s
-        ''', (user_id,))
+def get_schedule_changes(user_id):
+    """
+    Get lessons changed or deleted since an earlier sync for the user's group or teacher name
 
-        user = cursor.fetchone()
-        if not user:
-            app.logger.warning(f'SCHEDULE REQUEST ERROR: User ID {user_id} not found')
-            return jsonify({'error': 'User not found'}), 404
+    Clients pass the since value of their previous response; reset=true means
+    the delta is unknown and the cached weeks must be refetched.
+    """
+    try:
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError as e:
+            app.logger.warning(f'SCHEDULE CHANGES REQUEST ERROR: User {user_id} - {str(e)}')
+            return jsonify({'error': str(e)}), 400
 
-        # Format date for logs in a more readable format
-        display_date = datetime.strptime(date, '%Y-%m-%d').strftime('%d.%m.%Y')
+        filter_column, filter_value = schedule_filter(g.current_user)
 
-        # Enhanced logging with name
-        user_type_ru = "преподаватель" if user['user_type'] == 'teacher' else "студент"
-        app.logger.info(
-            f'SCHEDULE REQUESTED: {user["full_name"]} ({user_type_ru}) requested schedule for {display_date}')
-
-        # Rest of the function remains unchanged
-        if user['user_type'] == 'student':
-            cursor.execute('''
-                SELECT 
-                    id,
-                    DATE_FORMAT(date, '%%Y-%%m-%%d') as date,
-                    TIME_FORMAT(time_start, '%%H:%%i') as time_start,
-                    TIME_FORMAT(time_end, '%%H:%%i') as time_end,
-                    subject,
-                    lesson_type,
-                    subgroup,
-                    group_name,
-                    teacher_name,
-                    auditory,
-                    semester,
-                    week_number,
-                    course,
-                    faculty,
-                    weekday
-                FROM schedule 
-                WHERE date = %s 
-                AND group_name = %s 
-                ORDER BY time_start
-            ''', (date, user['filter_value']))
-        else:
-            cursor.execute('''
-                SELECT 
-                    id,
-                    DATE_FORMAT(date, '%%Y-%%m-%%d') as date,
-                    TIME_FORMAT(time_start, '%%H:%%i') as time_start,
-                    TIME_FORMAT(time_end, '%%H:%%i') as time_end,
-                    subject,
-                    lesson_type,
-                    subgroup,
-                    group_name,
-                    teacher_name,
-                    auditory,
-                    semester,
-                    week_number,
-                    course,
-                    faculty,
-                    weekday
-                FROM schedule 
-                WHERE date = %s 
-                AND teacher_name = %s
-                ORDER BY time_start
-            ''', (date, user['filter_value']))
-
-        schedule = cursor.fetchall()
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(SCHEDULE_SYNC_STATE_QUERY)
+        state = cursor.fetchone()
 
-        # Additional log about number of classes in schedule
-        app.logger.info(f'SCHEDULE DATA: {user["full_name"]} received {len(schedule)} classes for {display_date}')
+        changed, deleted = [], []
+        if filter_value and not schedule_sync_reset(state, since):
+            changes_query, tombstones_query = schedule_changes_queries(filter_column)
+            cursor.execute(changes_query, (filter_value, since))
+            changed = cursor.fetchall()
+            cursor.execute(tombstones_query, (filter_value, since))
+            deleted = [row['schedule_id'] for row in cursor.fetchall()]
 
-        return jsonify(schedule)
+        return jsonify(schedule_changes_payload(state, since, changed, deleted))
 
     except Exception as e:
-        app.logger.error(f'Error getting schedule for user {user_id}: {str(e)}')
+        app.logger.error(f'Error getting schedule changes for user {user_id}: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
     finally:
@@ -574,78 +3142,131 @@ def get_schedule(user_id):
 @app.route('/api/groups', methods=['GET'])
 def get_groups():
     """Get list of all groups"""
-    conn = get_db()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute('SELECT DISTINCT group_name FROM schedule WHERE group_name IS NOT NULL')
-        groups = [row['group_name'] for row in cursor.fetchall()]
-        return jsonify(groups)
+        version, groups = dictionary_cache.get('groups')
+        etag = make_etag(request.path, version)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        return etag_response(groups, etag, private=False)
 
     except Exception as e:
         app.logger.error(f'Groups fetch error: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
-    finally:
-        conn.close()
-
 
 @app.route('/api/teachers', methods=['GET'])
 def get_teachers():
     """Get list of all teachers"""
-    conn = get_db()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute('SELECT DISTINCT teacher_name FROM schedule WHERE teacher_name IS NOT NULL')
-        teachers = [row['teacher_name'] for row in cursor.fetchall()]
-        return jsonify(teachers)
+        version, teachers = dictionary_cache.get('teachers')
+        etag = make_etag(request.path, version)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        return etag_response(teachers, etag, private=False)
 
     except Exception as e:
         app.logger.error(f'Teachers fetch error: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
-    finally:
-        conn.close()
-
 
 @app.route('/api/schedule/groups', methods=['GET'])
 @require_auth
 def get_teacher_groups(user_id):
     """Get all groups for a teacher"""
-    conn = get_db()
-    cursor = conn.cursor()
-
     try:
         # Get teacher data
-        cursor.execute('SELECT teacher_name, user_type FROM users WHERE id = %s', (user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
 
-        if not user or user['user_type'] != 'teacher':
+        if user['user_type'] != 'teacher':
             return jsonify({'error': 'Access denied'}), 403
 
-        # Get all teacher's groups from the schedule
+        if use_schedule_read_model():
+            with schedule_read_model.lock:
+                store = schedule_read_model.store
+                etag = make_etag(request.path, user['teacher_name'], store.generation, store.version)
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+                return etag_response(store.groups_of_teacher(user['teacher_name']), etag)
+
+        conn = get_db()
+        cursor = conn.cursor()
+
+        etag = schedule_etag(cursor, 'WHERE teacher_name = %s', (user['teacher_name'],),
+                             request.path, user['teacher_name'])
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        # Get all teacher's groups from the adjacency table
         cursor.execute('''
-            SELECT DISTINCT group_name 
-            FROM schedule 
+            SELECT group_name 
+            FROM schedule_teacher_groups 
             WHERE teacher_name = %s
             ORDER BY group_name
         ''', (user['teacher_name'],))
 
         groups = [row['group_name'] for row in cursor.fetchall()]
-        return jsonify(groups)
+        return etag_response(groups, etag)
 
     except Exception as e:
         app.logger.error(f'Error getting teacher groups: {str(e)}')
         return jsonify({'error': str(e)}), 500
     finally:
-        conn.close()
+        if 'conn' in locals():
+            conn.close()
 
 
 # ============================================================
 # USER PROFILE ROUTES
 # ============================================================
 
+# Profile of the signed-in user
+PROFILE_QUERY = '''
+    SELECT id, email, full_name, user_type, group_name, teacher_name
+    FROM users WHERE id = %s
+'''
+
+# Profile with group/teacher metadata; params (kind, name, user_id) from profile_subject
+PROFILE_DETAILS_QUERY = '''
+    SELECT 
+        u.id,
+        u.email,
+        CONVERT(u.full_name USING utf8) as full_name,
+        u.user_type,
+        u.group_name,
+        u.teacher_name,
+        CONVERT(p.faculty USING utf8) as faculty,
+        p.course,
+        p.semester,
+        IFNULL(p.total_subjects, 0) as total_subjects,
+        IFNULL(p.total_days, 0) as total_days,
+        IFNULL(p.total_groups, 0) as total_groups,
+        IFNULL(p.total_lessons, 0) as total_lessons
+    FROM users u
+    LEFT JOIN schedule_profiles p ON p.kind = %s AND p.name = %s
+    WHERE u.id = %s
+'''
+
+
+def profile_subject(user):
+    """schedule_profiles key describing a user: students by group, everyone else by teacher name"""
+    if user['user_type'] == 'student':
+        return 'group', user['group_name']
+    return 'teacher', user['teacher_name']
+
+
+def shape_profile_details(kind, details):
+    """Keep the statistics each profile type has always returned"""
+    if kind == 'group':
+        del details['total_groups']
+    else:
+        del details['total_days']
+        details['course'] = None
+        details['semester'] = None
+    return details
+
+
 @app.route('/api/profile', methods=['GET'])
 @require_auth
 def get_profile(user_id):
@@ -654,10 +3275,7 @@ def get_profile(user_id):
     cursor = conn.cursor()
 
     try:
-        cursor.execute('''
-            SELECT id, email, full_name, user_type, group_name, teacher_name
-            FROM users WHERE id = %s
-        ''', (user_id,))
+        cursor.execute(PROFILE_QUERY, (user_id,))
 
         user = cursor.fetchone()
         if not user:
@@ -681,69 +3299,15 @@ def get_profile_details(user_id):
         conn = get_db()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
 
-        # Use CONVERT for proper encoding
-        cursor.execute('''
-            SELECT 
-                u.id,
-                u.email,
-                CONVERT(u.full_name USING utf8) as full_name,
-                u.user_type,
-                u.group_name,
-                u.teacher_name,
-                CONVERT(
-                    CASE 
-                        WHEN u.user_type = 'student' THEN 
-                            (SELECT faculty FROM schedule WHERE group_name = u.group_name LIMIT 1)
-                        ELSE 
-                            (SELECT DISTINCT faculty FROM schedule WHERE teacher_name = u.teacher_name LIMIT 1)
-                    END
-                USING utf8) as faculty,
-                CASE 
-                    WHEN u.user_type = 'student' THEN 
-                        (SELECT course FROM schedule WHERE group_name = u.group_name LIMIT 1)
-                    ELSE NULL
-                END as course,
-                CASE 
-                    WHEN u.user_type = 'student' THEN 
-                        (SELECT DISTINCT semester FROM schedule WHERE group_name = u.group_name LIMIT 1)
-                    ELSE NULL
-                END as semester
-            FROM users u
-            WHERE u.id = %s
-        ''', (user_id,))
+        kind, name = profile_subject(g.current_user)
+        cursor.execute(PROFILE_DETAILS_QUERY, (kind, name, user_id))
 
         user_details = cursor.fetchone()
 
         if not user_details:
             return jsonify({'error': 'User not found'}), 404
 
-        # Get statistics
-        if user_details['user_type'] == 'student':
-            cursor.execute('''
-                SELECT 
-                    COUNT(DISTINCT subject) as total_subjects,
-                    COUNT(DISTINCT date) as total_days,
-                    COUNT(*) as total_lessons
-                FROM schedule 
-                WHERE group_name = %s
-                AND semester = (SELECT MAX(semester) FROM schedule WHERE group_name = %s)
-            ''', (user_details['group_name'], user_details['group_name']))
-        else:
-            cursor.execute('''
-                SELECT 
-                    COUNT(DISTINCT subject) as total_subjects,
-                    COUNT(DISTINCT group_name) as total_groups,
-                    COUNT(*) as total_lessons
-                FROM schedule 
-                WHERE teacher_name = %s
-                AND semester = (SELECT MAX(semester) FROM schedule)
-            ''', (user_details['teacher_name'],))
-
-        stats = cursor.fetchone()
-
-        # Add statistics to user details
-        if stats:
-            user_details.update(stats)
+        shape_profile_details(kind, user_details)
 
         return jsonify(user_details)
 
@@ -767,12 +3331,7 @@ def get_my_teachers(user_id):
         app.logger.info(f'Getting teachers for student_id: {user_id}')
 
         # Get student's group
-        cursor.execute('SELECT group_name, user_type FROM users WHERE id = %s', (user_id,))
-        user = cursor.fetchone()
-        app.logger.info(f'Found user: {user}')
-
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user = g.current_user
 
         if user['user_type'] != 'student':
             return jsonify({'error': 'Only students can view teachers'}), 403
@@ -782,16 +3341,14 @@ def get_my_teachers(user_id):
 
         # Get teachers who teach this group
         cursor.execute('''
-            SELECT DISTINCT 
+            SELECT 
                 u.id,
                 u.full_name,
                 u.email,
                 u.teacher_name
-            FROM users u
-            JOIN schedule s ON u.teacher_name = s.teacher_name
-            WHERE s.group_name = %s
-            AND u.user_type = 'teacher'
-            AND u.teacher_name IS NOT NULL
+            FROM schedule_teacher_groups tg
+            JOIN users u ON u.teacher_name = tg.teacher_name AND u.user_type = 'teacher'
+            WHERE tg.group_name = %s
         ''', (user['group_name'],))
 
         teachers = cursor.fetchall()
@@ -815,32 +3372,21 @@ def get_my_students(user_id):
 
     try:
         # Get teacher's name
-        cursor.execute('SELECT teacher_name, user_type FROM users WHERE id = %s', (user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
 
-        if not user or user['user_type'] != 'teacher':
+        if user['user_type'] != 'teacher':
             return jsonify({'error': 'Access denied'}), 403
 
-        # Get collation of teacher_name column from schedule table
-        cursor.execute(
-            "SELECT COLLATION_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = 'schedule' AND COLUMN_NAME = 'teacher_name'")
-        result = cursor.fetchone()
-        teacher_name_collation = result['COLLATION_NAME'] if result else 'utf8mb4_0900_ai_ci'  # Default if not found
-
         # Get all students from groups taught by this teacher (all time)
-        cursor.execute(f'''
-            SELECT DISTINCT
+        cursor.execute('''
+            SELECT 
                 u.id,
                 u.full_name,
                 u.email,
                 u.group_name
-            FROM users u
-            WHERE u.group_name IN (
-                SELECT DISTINCT group_name
-                FROM schedule
-                WHERE teacher_name COLLATE {teacher_name_collation} = %s COLLATE {teacher_name_collation}
-            )
-            AND u.user_type = 'student'
+            FROM schedule_teacher_groups tg
+            JOIN users u ON u.group_name = tg.group_name AND u.user_type = 'student'
+            WHERE tg.teacher_name = %s
             ORDER BY u.group_name, u.full_name
         ''', (user['teacher_name'],))
 
@@ -877,6 +3423,26 @@ def view_logs():
             return send_file(log_path, mimetype='text/plain')
         return jsonify({'error': 'Log file not found'}), 404
 
+    # Time index summary per segment
+    if format_type == 'index':
+        segments = []
+        for path in log_file_paths():
+            blocks = handler.segment_index(path) or []
+            known = [block for block in blocks if block['first'] is not None]
+            levels = {}
+            for block in blocks:
+                for level, count in block['levels'].items():
+                    levels[level] = levels.get(level, 0) + count
+            segments.append({
+                'file': os.path.basename(path),
+                'bytes': os.path.getsize(path),
+                'blocks': len(blocks),
+                'start': datetime.fromtimestamp(min(b['first'] for b in known)).isoformat() if known else None,
+                'end': datetime.fromtimestamp(max(b['last'] for b in known)).isoformat() if known else None,
+                'levels': levels
+            })
+        return jsonify(segments)
+
     # For JSON format
     if format_type == 'json':
         logs = read_logs(lines, filter_text, log_level, start_date, end_date)
@@ -991,6 +3557,21 @@ def view_logs():
 @require_admin
 def admin_dashboard_stats(admin_id):
     """Get admin dashboard statistics"""
+    try:
+        stats = stats_cache.get('dashboard', compute_dashboard_stats)
+
+        # Log admin action
+        log_admin_activity(admin_id, "viewed dashboard statistics")
+
+        return jsonify(stats)
+
+    except Exception as e:
+        app.logger.error(f'Admin dashboard stats error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+def compute_dashboard_stats():
+    """Count students, teachers, subjects and lessons (cached in stats_cache)"""
     conn = get_db()
     cursor = conn.cursor()
 
@@ -1011,24 +3592,50 @@ def admin_dashboard_stats(admin_id):
         cursor.execute("SELECT COUNT(*) as count FROM schedule")
         lessons_count = cursor.fetchone()['count']
 
-        stats = {
+        return {
             'totalStudents': students_count,
             'totalTeachers': teachers_count,
             'totalCourses': courses_count,
             'totalLessons': lessons_count
         }
 
-        # Log admin action
-        log_admin_activity(admin_id, "viewed dashboard statistics")
+    finally:
+        conn.close()
 
-        return jsonify(stats)
 
-    except Exception as e:
-        app.logger.error(f'Admin dashboard stats error: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+@app.route('/api/admin/db/pool', methods=['GET'])
+@require_admin
+def admin_db_pool_stats(admin_id):
+    """Get database connection pool metrics"""
+    return jsonify(db_pool.stats())
 
-    finally:
-        conn.close()
+
+@app.route('/api/admin/auth/hasher', methods=['GET'])
+@require_admin
+def admin_password_hasher_stats(admin_id):
+    """Get password hashing pool metrics"""
+    return jsonify(password_hasher.stats())
+
+
+@app.route('/api/admin/schedule/response-cache', methods=['GET'])
+@require_admin
+def admin_schedule_response_cache(admin_id):
+    """Get schedule response cache size and hit/miss counters"""
+    return jsonify(schedule_response_cache.stats())
+
+
+@app.route('/api/admin/schedule/read-model', methods=['GET'])
+@require_admin
+def admin_schedule_read_model(admin_id):
+    """Get schedule read model status and memory footprint"""
+    if not schedule_read_model.loaded:
+        return jsonify({'enabled': app.config['SCHEDULE_READ_MODEL'], 'loaded': False})
+
+    with schedule_read_model.lock:
+        report = schedule_read_model.store.memory_report()
+
+    report.update({'enabled': app.config['SCHEDULE_READ_MODEL'], 'loaded': True})
+    return jsonify(report)
 
 
 @app.route('/api/admin/activity-log', methods=['GET'])
@@ -1037,22 +3644,38 @@ def admin_activity_log(admin_id):
     """Get admin activity log"""
     limit = int(request.args.get('limit', 10))
     offset = int(request.args.get('offset', 0))
+    page_cursor = request.args.get('cursor')
     conn = get_db()
     cursor = conn.cursor()
 
     try:
-        # Get activity logs with admin name
-        cursor.execute('''
+        query = '''
             SELECT al.*, u.full_name as admin_name 
             FROM admin_activity_log al
             JOIN users u ON al.admin_id = u.id
-            ORDER BY al.created_at DESC
-            LIMIT %s OFFSET %s
-        ''', (limit, offset))
+        '''
+        params = []
+
+        # Keyset pagination: continue after the last row of the previous page
+        if page_cursor:
+            try:
+                created_at, last_id = decode_cursor(page_cursor, 2)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            query += ' WHERE (al.created_at < %s OR (al.created_at = %s AND al.id < %s))'
+            params.extend([created_at, created_at, last_id])
+            offset = 0
+
+        # Get activity logs with admin name
+        query += ' ORDER BY al.created_at DESC, al.id DESC LIMIT %s OFFSET %s'
+        params.extend([limit, offset])
 
+        cursor.execute(query, params)
         logs = cursor.fetchall()
 
-        return jsonify({'logs': logs})
+        next_cursor = encode_cursor(logs[-1]['created_at'], logs[-1]['id']) if len(logs) == limit else None
+
+        return paginated_response({'logs': logs, 'nextCursor': next_cursor}, next_cursor)
 
     except Exception as e:
         app.logger.error(f'Admin activity log error: {str(e)}')
@@ -1070,6 +3693,7 @@ def admin_get_users(admin_id):
     search = request.args.get('search')  # Search by name, email, group
     limit = int(request.args.get('limit', 50))
     offset = int(request.args.get('offset', 0))
+    page_cursor = request.args.get('cursor')  # Keyset page token, takes precedence over offset
 
     conn = get_db()
     cursor = conn.cursor()
@@ -1091,28 +3715,42 @@ def admin_get_users(admin_id):
             params.append(user_type)
 
         # Add search filter if provided
+        rank_expression = None
         if search:
-            query += ''' AND (
-                full_name LIKE %s OR 
-                email LIKE %s OR 
-                group_name LIKE %s OR
-                teacher_name LIKE %s
-            )'''
-            search_param = f'%{search}%'
-            params.extend([search_param, search_param, search_param, search_param])
-
-        # Add limit and offset
-        query += ' ORDER BY created_at DESC LIMIT %s OFFSET %s'
-        params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        users = cursor.fetchall()
+            condition, search_params, rank_expression = build_search_filter(USER_SEARCH_COLUMNS, search)
+            query += ' AND ' + condition
+            params.extend(search_params)
+
+        # Continue after the last row of the previous page
+        if page_cursor:
+            try:
+                created_at, last_id = decode_cursor(page_cursor, 2)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            query += ' AND (created_at < %s OR (created_at = %s AND id < %s))'
+            params.extend([created_at, created_at, last_id])
+            offset = 0
+
+        # Search results are ranked by relevance unless paging by cursor
+        next_cursor = None
+        if rank_expression and not page_cursor:
+            query += f' ORDER BY {rank_expression} DESC, id DESC LIMIT %s OFFSET %s'
+            params.extend(search_params + [limit, offset])
+            cursor.execute(query, params)
+            users = cursor.fetchall()
+        else:
+            query += ' ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s'
+            params.extend([limit, offset])
+            cursor.execute(query, params)
+            users = cursor.fetchall()
+            if len(users) == limit:
+                next_cursor = encode_cursor(users[-1]['created_at'], users[-1]['id'])
 
         # Log admin action
         log_admin_activity(admin_id, "viewed user list",
                            f"Found {len(users)} users")
 
-        return jsonify(users)
+        return paginated_response(users, next_cursor)
 
     except Exception as e:
         app.logger.error(f'Admin get users error: {str(e)}')
@@ -1178,7 +3816,7 @@ def admin_create_user(admin_id):
             return jsonify({'error': 'Email already exists'}), 400
 
         # Hash password
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = password_hasher.hash(data['password'])
 
         # Insert user
         cursor.execute('''
@@ -1194,9 +3832,11 @@ def admin_create_user(admin_id):
             data.get('teacher'),
             data.get('status', 'active')
         ))
+        user_id = cursor.lastrowid
+        rollup_user(cursor, user_id, 1)
 
         conn.commit()
-        user_id = cursor.lastrowid
+        stats_cache.invalidate('dashboard')
 
         # Get the created user
         cursor.execute('''
@@ -1215,6 +3855,10 @@ def admin_create_user(admin_id):
 
         return jsonify(user)
 
+    except PasswordHasherBusyError as e:
+        app.logger.warning(f'Admin create user deferred: {str(e)}')
+        return jsonify({'error': 'Server is busy, please try again'}), 503
+
     except Exception as e:
         conn.rollback()
         app.logger.error(f'Admin create user error: {str(e)}')
@@ -1258,7 +3902,7 @@ def admin_update_user(admin_id, user_id):
 
         if 'password' in data:
             update_fields.append('password = %s')
-            params.append(generate_password_hash(data['password']))
+            params.append(password_hasher.hash(data['password']))
 
         if 'fullName' in data:
             update_fields.append('full_name = %s')
@@ -1288,9 +3932,16 @@ def admin_update_user(admin_id, user_id):
         query += ', '.join(update_fields) + ' WHERE id = %s'
         params.append(user_id)
 
-        # Execute update
+        # Execute update, moving the user between rollup counters if the type changes
+        if 'userType' in data:
+            rollup_user(cursor, user_id, -1)
         cursor.execute(query, params)
+        if 'userType' in data:
+            rollup_user(cursor, user_id, 1)
+        record_user_invalidation(cursor, user_id)
         conn.commit()
+        identity_cache.invalidate(user_id)
+        stats_cache.invalidate('dashboard')
 
         # Get updated user
         cursor.execute('''
@@ -1310,6 +3961,11 @@ def admin_update_user(admin_id, user_id):
 
         return jsonify(updated_user)
 
+    except PasswordHasherBusyError as e:
+        conn.rollback()
+        app.logger.warning(f'Admin update user deferred: {str(e)}')
+        return jsonify({'error': 'Server is busy, please try again'}), 503
+
     except Exception as e:
         conn.rollback()
         app.logger.error(f'Admin update user error: {str(e)}')
@@ -1339,8 +3995,13 @@ def admin_delete_user(admin_id, user_id):
             return jsonify({'error': 'Cannot delete your own account'}), 400
 
         # Delete user
+        rollup_user(cursor, user_id, -1)
         cursor.execute('DELETE FROM users WHERE id = %s', (user_id,))
+        record_user_invalidation(cursor, user_id)
         conn.commit()
+        token_cache.revoke_user(user_id)
+        identity_cache.invalidate(user_id)
+        stats_cache.invalidate('dashboard')
 
         # Log admin action
         log_admin_activity(admin_id, "deleted user",
@@ -1368,6 +4029,7 @@ def admin_get_schedules(admin_id):
     search = request.args.get('search')
     limit = int(request.args.get('limit', 100))
     offset = int(request.args.get('offset', 0))
+    page_cursor = request.args.get('cursor')  # Keyset page token, takes precedence over offset
 
     conn = get_db()
     cursor = conn.cursor()
@@ -1377,10 +4039,11 @@ def admin_get_schedules(admin_id):
         query = '''
             SELECT 
                 id, semester, week_number, group_name, course, faculty, subject,
-                lesson_type, subgroup, DATE_FORMAT(date, '%Y-%m-%d') as date, 
-                TIME_FORMAT(time_start, '%H:%i') as time_start, 
-                TIME_FORMAT(time_end, '%H:%i') as time_end, 
-                weekday, teacher_name, auditory
+                lesson_type, subgroup, DATE_FORMAT(date, '%%Y-%%m-%%d') as date, 
+                TIME_FORMAT(time_start, '%%H:%%i') as time_start, 
+                TIME_FORMAT(time_end, '%%H:%%i') as time_end, 
+                weekday, teacher_name, auditory,
+                TIME_FORMAT(time_start, '%%H:%%i:%%s') as sort_time_start
             FROM schedule
             WHERE 1=1
         '''
@@ -1397,22 +4060,41 @@ def admin_get_schedules(admin_id):
             params.extend([date_from, date_to])
 
         # Add search filter if provided
+        rank_expression = None
         if search:
-            query += ''' AND (
-                group_name LIKE %s OR 
-                subject LIKE %s OR 
-                teacher_name LIKE %s OR
-                auditory LIKE %s
-            )'''
-            search_param = f'%{search}%'
-            params.extend([search_param, search_param, search_param, search_param])
-
-        # Add ordering and pagination
-        query += ' ORDER BY date, time_start LIMIT %s OFFSET %s'
-        params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        schedules = cursor.fetchall()
+            condition, search_params, rank_expression = build_search_filter(SCHEDULE_SEARCH_COLUMNS, search)
+            query += ' AND ' + condition
+            params.extend(search_params)
+
+        # Continue after the last row of the previous page
+        if page_cursor:
+            try:
+                last_date, last_time, last_id = decode_cursor(page_cursor, 3)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            # date >= keeps this a single range on idx_schedule_date_time
+            query += ' AND date >= %s AND (date, time_start, id) > (%s, %s, %s)'
+            params.extend([last_date, last_date, last_time, last_id])
+            offset = 0
+
+        # Search results are ranked by relevance unless paging by cursor
+        next_cursor = None
+        if rank_expression and not page_cursor:
+            query += f' ORDER BY {rank_expression} DESC, date, time_start, id LIMIT %s OFFSET %s'
+            params.extend(search_params + [limit, offset])
+            cursor.execute(query, params)
+            schedules = cursor.fetchall()
+        else:
+            query += ' ORDER BY date, time_start, id LIMIT %s OFFSET %s'
+            params.extend([limit, offset])
+            cursor.execute(query, params)
+            schedules = cursor.fetchall()
+            last = schedules[-1] if len(schedules) == limit else None
+            # NULL keys cannot be compared against; mig.py 0008 makes both columns NOT NULL
+            if last and last['date'] is not None and last['sort_time_start'] is not None:
+                next_cursor = encode_cursor(last['date'], last['sort_time_start'], last['id'])
+        for schedule in schedules:
+            del schedule['sort_time_start']
 
         # Log admin action
         filter_desc = f"Filters: " + ", ".join([
@@ -1424,7 +4106,7 @@ def admin_get_schedules(admin_id):
         log_admin_activity(admin_id, "viewed schedule",
                            f"Found {len(schedules)} entries. {filter_desc}")
 
-        return jsonify(schedules)
+        return paginated_response(schedules, next_cursor)
 
     except Exception as e:
         app.logger.error(f'Admin get schedules error: {str(e)}')
@@ -1445,9 +4127,9 @@ def admin_get_schedule(admin_id, schedule_id):
         cursor.execute('''
             SELECT 
                 id, semester, week_number, group_name, course, faculty, subject,
-                lesson_type, subgroup, DATE_FORMAT(date, '%Y-%m-%d') as date, 
-                TIME_FORMAT(time_start, '%H:%i') as time_start, 
-                TIME_FORMAT(time_end, '%H:%i') as time_end, 
+                lesson_type, subgroup, DATE_FORMAT(date, '%%Y-%%m-%%d') as date, 
+                TIME_FORMAT(time_start, '%%H:%%i') as time_start, 
+                TIME_FORMAT(time_end, '%%H:%%i') as time_end, 
                 weekday, teacher_name, auditory
             FROM schedule
             WHERE id = %s
@@ -1482,9 +4164,7 @@ def admin_create_schedule(admin_id):
 
     try:
         # Check required fields
-        required_fields = ['date', 'time_start', 'time_end', 'subject',
-                           'lesson_type', 'group_name', 'teacher_name', 'auditory']
-        for field in required_fields:
+        for field in SCHEDULE_REQUIRED_FIELDS:
             if not data.get(field):
                 return jsonify({'error': f'Field {field} is required'}), 400
 
@@ -1511,17 +4191,26 @@ def admin_create_schedule(admin_id):
             data.get('faculty'),
             data.get('weekday', 1)  # Default to Monday if not provided
         ))
+        schedule_id = cursor.lastrowid
+        sync_dictionaries(cursor, new_row=data)
+        sync_teacher_groups(cursor, new_row=data)
+        sync_profiles(cursor, new_row=data)
+        rollup_schedule(cursor, schedule_id, 1)
+        record_schedule_invalidation(cursor, schedule_cache_keys(data))
 
         conn.commit()
-        schedule_id = cursor.lastrowid
+        dictionary_cache.invalidate()
+        stats_cache.invalidate('dashboard')
+        schedule_read_model.apply_ids(cursor, [schedule_id])
+        schedule_response_cache.invalidate_rows(data)
 
         # Get the created schedule
         cursor.execute('''
             SELECT 
                 id, semester, week_number, group_name, course, faculty, subject,
-                lesson_type, subgroup, DATE_FORMAT(date, '%Y-%m-%d') as date, 
-                TIME_FORMAT(time_start, '%H:%i') as time_start, 
-                TIME_FORMAT(time_end, '%H:%i') as time_end, 
+                lesson_type, subgroup, DATE_FORMAT(date, '%%Y-%%m-%%d') as date, 
+                TIME_FORMAT(time_start, '%%H:%%i') as time_start, 
+                TIME_FORMAT(time_end, '%%H:%%i') as time_end, 
                 weekday, teacher_name, auditory
             FROM schedule
             WHERE id = %s
@@ -1544,6 +4233,118 @@ def admin_create_schedule(admin_id):
         conn.close()
 
 
+@app.route('/api/admin/schedule/import', methods=['POST'])
+@require_admin
+def admin_import_schedule(admin_id):
+    """
+    Bulk import schedule items from CSV or NDJSON
+
+    The body is either a multipart upload in field "file" or the raw file.
+    Format comes from ?format=csv|ndjson, else the file extension or content type.
+    Rows carrying an existing id update that lesson; other rows are inserted.
+    """
+    chunk_size = app.config['SCHEDULE_IMPORT_CHUNK_SIZE']
+    max_errors = app.config['SCHEDULE_IMPORT_MAX_ERRORS']
+    started = time.monotonic()
+    imported = 0
+    failed = 0
+    chunks = 0
+    errors = []
+    rebuilt = False
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    try:
+        upload = request.files.get('file')
+        source = upload.stream if upload else request.stream
+        source_name = upload.filename if upload else request.mimetype
+
+        import_format = request.args.get('format')
+        if not import_format:
+            is_ndjson = source_name.endswith(('.ndjson', '.jsonl', 'ndjson'))
+            import_format = 'ndjson' if is_ndjson else 'csv'
+        if import_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Format must be csv or ndjson'}), 400
+
+        def report(line_number, messages):
+            nonlocal failed
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({'row': line_number, 'errors': messages})
+
+        def flush(chunk):
+            nonlocal imported, chunks
+            chunk_imported, failures = upsert_schedule_chunk(conn, cursor, chunk)
+            imported += chunk_imported
+            chunks += 1
+            for line_number, message in failures:
+                report(line_number, [message])
+
+        chunk = []
+        for line_number, record, parse_error in iter_import_records(source, import_format):
+            if parse_error:
+                report(line_number, [parse_error])
+                continue
+
+            params, row_errors = normalize_import_record(record)
+            if row_errors:
+                report(line_number, row_errors)
+                continue
+
+            chunk.append((line_number, params))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+
+        if chunk:
+            flush(chunk)
+
+        # Derived data is rebuilt once instead of per row
+        if imported:
+            refresh_after_import(conn, cursor)
+            rebuilt = True
+
+        duration = round(time.monotonic() - started, 3)
+
+        # Log admin action
+        log_admin_activity(admin_id, "imported schedule",
+                           f"Source: {source_name}, Format: {import_format}, Imported: {imported}, "
+                           f"Failed: {failed}, Chunks: {chunks}, Duration: {duration}s")
+
+        return jsonify({
+            'imported': imported,
+            'failed': failed,
+            'chunks': chunks,
+            'duration': duration,
+            'errors': errors,
+            'errorsTruncated': failed > len(errors)
+        })
+
+    except Exception as e:
+        conn.rollback()
+        app.logger.error(f'Admin import schedule error: {str(e)}')
+        log_admin_activity(admin_id, "import schedule failed",
+                           f"Imported before the error: {imported}, Failed: {failed}, Chunks: {chunks}, "
+                           f"Error: {str(e)}")
+        return jsonify({
+            'error': str(e),
+            'imported': imported,
+            'failed': failed,
+            'errors': errors,
+            'errorsTruncated': failed > len(errors)
+        }), 500
+
+    finally:
+        # Chunks committed before a failure must still reach the derived tables
+        if imported and not rebuilt:
+            try:
+                refresh_after_import(conn, cursor)
+            except Exception as e:
+                app.logger.error(f'Derived data rebuild after failed import error: {str(e)}')
+        conn.close()
+
+
 @app.route('/api/admin/schedule/<int:schedule_id>', methods=['PUT'])
 @require_admin
 def admin_update_schedule(admin_id, schedule_id):
@@ -1596,17 +4397,36 @@ def admin_update_schedule(admin_id, schedule_id):
         query += ', '.join(update_fields) + ' WHERE id = %s'
         params.append(schedule_id)
 
-        # Execute update
+        # Execute update, moving the row between rollup counters if a counted column changes
+        rollup_changed = any(field in data for field in ROLLUP_DIMENSIONS + ('semester', 'faculty'))
+        if rollup_changed:
+            rollup_schedule(cursor, schedule_id, -1)
         cursor.execute(query, params)
+        if rollup_changed:
+            rollup_schedule(cursor, schedule_id, 1)
+        updated_row = dict(schedule)
+        updated_row.update({db_field: data[api_field] for api_field, db_field in fields if api_field in data})
+        sync_dictionaries(cursor, schedule, updated_row)
+        sync_teacher_groups(cursor, schedule, updated_row)
+        sync_profiles(cursor, schedule, updated_row)
+        moved_from = [schedule[column] if updated_row[column] != schedule[column] else None
+                      for column in ('group_name', 'teacher_name')]
+        if any(moved_from):
+            record_tombstone(cursor, schedule_id, *moved_from)
+        record_schedule_invalidation(cursor, schedule_cache_keys(schedule, updated_row))
         conn.commit()
+        dictionary_cache.invalidate()
+        stats_cache.invalidate('dashboard')
+        schedule_read_model.apply_ids(cursor, [schedule_id])
+        schedule_response_cache.invalidate_rows(schedule, updated_row)
 
         # Get updated schedule
         cursor.execute('''
             SELECT 
                 id, semester, week_number, group_name, course, faculty, subject,
-                lesson_type, subgroup, DATE_FORMAT(date, '%Y-%m-%d') as date, 
-                TIME_FORMAT(time_start, '%H:%i') as time_start, 
-                TIME_FORMAT(time_end, '%H:%i') as time_end, 
+                lesson_type, subgroup, DATE_FORMAT(date, '%%Y-%%m-%%d') as date, 
+                TIME_FORMAT(time_start, '%%H:%%i') as time_start, 
+                TIME_FORMAT(time_end, '%%H:%%i') as time_end, 
                 weekday, teacher_name, auditory
             FROM schedule
             WHERE id = %s
@@ -1639,15 +4459,26 @@ def admin_delete_schedule(admin_id, schedule_id):
 
     try:
         # Check if schedule exists and get info for logging
-        cursor.execute('SELECT subject, group_name FROM schedule WHERE id = %s', (schedule_id,))
+        cursor.execute('SELECT subject, group_name, teacher_name, date FROM schedule WHERE id = %s', (schedule_id,))
         schedule = cursor.fetchone()
 
         if not schedule:
             return jsonify({'error': 'Schedule not found'}), 404
 
         # Delete schedule
+        rollup_schedule(cursor, schedule_id, -1)
         cursor.execute('DELETE FROM schedule WHERE id = %s', (schedule_id,))
+        sync_dictionaries(cursor, old_row=schedule)
+        sync_teacher_groups(cursor, old_row=schedule)
+        sync_profiles(cursor, old_row=schedule)
+        record_tombstone(cursor, schedule_id, schedule['group_name'], schedule['teacher_name'])
+        purge_tombstones(cursor)
+        record_schedule_invalidation(cursor, schedule_cache_keys(schedule))
         conn.commit()
+        dictionary_cache.invalidate()
+        stats_cache.invalidate('dashboard')
+        schedule_read_model.remove_ids([schedule_id])
+        schedule_response_cache.invalidate_rows(schedule)
 
         # Log admin action
         log_admin_activity(admin_id, "deleted schedule entry",
@@ -1675,12 +4506,13 @@ def admin_analytics_users(admin_id):
         # Get user registration stats by month
         cursor.execute('''
             SELECT 
-                DATE_FORMAT(created_at, '%Y-%m') as month,
-                COUNT(*) as count,
-                SUM(CASE WHEN user_type = 'student' THEN 1 ELSE 0 END) as students,
-                SUM(CASE WHEN user_type = 'teacher' THEN 1 ELSE 0 END) as teachers,
-                SUM(CASE WHEN user_type = 'admin' THEN 1 ELSE 0 END) as admins
-            FROM users
+                month,
+                CAST(SUM(user_count) AS SIGNED) as count,
+                CAST(SUM(CASE WHEN user_type = 'student' THEN user_count ELSE 0 END) AS SIGNED) as students,
+                CAST(SUM(CASE WHEN user_type = 'teacher' THEN user_count ELSE 0 END) AS SIGNED) as teachers,
+                CAST(SUM(CASE WHEN user_type = 'admin' THEN user_count ELSE 0 END) AS SIGNED) as admins
+            FROM user_rollup
+            WHERE user_count > 0
             GROUP BY month
             ORDER BY month
         ''')
@@ -1691,8 +4523,9 @@ def admin_analytics_users(admin_id):
         cursor.execute('''
             SELECT 
                 user_type,
-                COUNT(*) as count
-            FROM users
+                CAST(SUM(user_count) AS SIGNED) as count
+            FROM user_rollup
+            WHERE user_count > 0
             GROUP BY user_type
         ''')
 
@@ -1718,60 +4551,40 @@ def admin_analytics_users(admin_id):
 @app.route('/api/admin/analytics/schedule', methods=['GET'])
 @require_admin
 def admin_analytics_schedule(admin_id):
-    """Get schedule analytics for admin dashboard"""
+    """Get schedule analytics for admin dashboard (optionally for one semester and/or faculty)"""
     conn = get_db()
     cursor = conn.cursor()
 
     try:
-        # Get schedule distribution by day of week
-        cursor.execute('''
-            SELECT 
-                weekday,
-                COUNT(*) as count
-            FROM schedule
-            GROUP BY weekday
-            ORDER BY weekday
-        ''')
-
-        weekday_distribution = cursor.fetchall()
-
-        # Get schedule distribution by lesson type
-        cursor.execute('''
-            SELECT 
-                lesson_type,
-                COUNT(*) as count
-            FROM schedule
-            GROUP BY lesson_type
-            ORDER BY count DESC
-        ''')
-
-        lesson_types = cursor.fetchall()
-
-        # Get top teachers by lesson count
-        cursor.execute('''
-            SELECT 
-                teacher_name,
-                COUNT(*) as count
-            FROM schedule
-            GROUP BY teacher_name
-            ORDER BY count DESC
-            LIMIT 10
-        ''')
-
-        top_teachers = cursor.fetchall()
-
-        # Get top subjects by lesson count
-        cursor.execute('''
-            SELECT 
-                subject,
-                COUNT(*) as count
-            FROM schedule
-            GROUP BY subject
-            ORDER BY count DESC
-            LIMIT 10
-        ''')
-
-        top_subjects = cursor.fetchall()
+        conditions, params = rollup_filter()
+
+        def distribution(dimension, order_by, limit=None):
+            """Lesson counts per value of one dimension, summed over the matching rollup rows"""
+            where_clause = ' AND '.join(['dimension = %s', 'lesson_count > 0'] + conditions)
+            query = f'''
+                SELECT value, value_is_null, CAST(SUM(lesson_count) AS SIGNED) as count
+                FROM schedule_rollup
+                WHERE {where_clause}
+                GROUP BY value, value_is_null
+                ORDER BY {order_by}
+            '''
+            if limit:
+                query += f' LIMIT {limit}'
+            cursor.execute(query, [dimension] + params)
+
+            # Flagged NULLs back to None (a stored '' stays ''), weekdays back to integers
+            rows = []
+            for row in cursor.fetchall():
+                value = None if row['value_is_null'] else row['value']
+                if dimension == 'weekday' and value is not None:
+                    value = int(value)
+                rows.append({dimension: value, 'count': row['count']})
+            return rows
+
+        weekday_distribution = distribution('weekday', 'CAST(value AS UNSIGNED)')
+        lesson_types = distribution('lesson_type', 'count DESC')
+        top_teachers = distribution('teacher_name', 'count DESC', limit=10)
+        top_subjects = distribution('subject', 'count DESC', limit=10)
 
         # Log admin action
         log_admin_activity(admin_id, "viewed schedule analytics",
@@ -1792,10 +4605,121 @@ def admin_analytics_schedule(admin_id):
         conn.close()
 
 
+@app.route('/api/admin/analytics/rebuild', methods=['POST'])
+@require_admin
+def admin_rebuild_analytics(admin_id):
+    """Recompute analytics rollups from the schedule and users tables"""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    try:
+        started = time.monotonic()
+        rebuild_rollups(cursor)
+        conn.commit()
+        duration = round(time.monotonic() - started, 3)
+
+        # Log admin action
+        log_admin_activity(admin_id, "rebuilt analytics rollups", f"Duration: {duration}s")
+
+        return jsonify({'success': True, 'duration': duration})
+
+    except Exception as e:
+        conn.rollback()
+        app.logger.error(f'Admin rebuild analytics error: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        conn.close()
+
+
+# ============================================================
+# HEALTH CHECK ROUTES
+# ============================================================
+
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the worker is up and answering requests"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe: the worker can get a database connection and run a query"""
+    try:
+        conn = db_pool.acquire(timeout=app.config['READINESS_TIMEOUT'])
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+        finally:
+            conn.close()
+
+    except Exception as e:
+        app.logger.warning(f'Readiness check failed: {str(e)}')
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+
+    pool = db_pool.stats()
+    return jsonify({'status': 'ready', 'pid': os.getpid(), 'pool': {'size': pool['size'], 'in_use': pool['in_use']}})
+
+
 # ============================================================
 # SERVER STARTUP
 # ============================================================
 
+def preload():
+    """Build shared state in the master before workers are forked (see wsgi.py)"""
+    # Schema changes are left to `python mig.py`; this only fills derived tables that are empty
+    try:
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            backfill_derived_tables(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        app.logger.error(f'Derived table backfill error: {str(e)}')
+
+    if app.config['SCHEDULE_READ_MODEL']:
+        # Forked workers share the loaded arrays copy-on-write
+        schedule_read_model.load()
+
+    # Workers open their own connections
+    db_pool.reset()
+
+
+def after_fork():
+    """Replace per-process state inherited from the master (gunicorn post_fork hook)"""
+    global log_queue, log_listener
+
+    db_pool.reset(close_idle=False)
+    activity_log_writer.reset()
+
+    if not (app.config['LOG_QUEUE'] and app.config['LOG_SHARED_QUEUE']):
+        # This worker writes the log file itself
+        handler.claim_writer()
+
+    if app.config['LOG_QUEUE']:
+        # Only the master may stop the listener; a worker with its own queue needs its own thread
+        atexit.unregister(log_listener.stop)
+        if app.config['LOG_SHARED_QUEUE']:
+            log_queue.reset()
+        else:
+            log_queue = queue.Queue(-1)
+            queue_handler.queue = log_queue
+            log_listener = QueueListener(log_queue, handler)
+            log_listener.start()
+            atexit.register(log_listener.stop)
+
+    try:
+        db_pool.warm_up()
+    except Exception as e:
+        app.logger.error(f'Worker {os.getpid()} pool warm-up error: {str(e)}')
+
+
 if __name__ == '__main__':
+    # Development server; production runs `python mig.py` once, then `gunicorn -c gunicorn.conf.py wsgi:app`
+    from mig import migrate
+    migrate()
     init_db()
+    db_pool.warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
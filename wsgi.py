@@ -0,0 +1,13 @@
+"""
+Production WSGI entry point
+
+    pip install -r requirements.txt
+    python mig.py                              # one-shot schema setup and migrations
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module in the gunicorn master (preload_app) loads the app once
+before the workers are forked.
+"""
+from server import app, preload
+
+preload()